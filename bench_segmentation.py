@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# bench_segmentation.py － 去背模型效能 / 品質比較（本機 CPU）
+# 用法：
+#   python bench_segmentation.py samples/ [--models u2netp silueta isnet-general-use] [--runs 3]
+# samples/ 放測試圖；若有 <檔名>_mask.png 會當作標準答案計算 IoU，
+# 沒有的話以 --reference 模型（預設 isnet-general-use）的結果當基準
+
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from imaging import load_upload
+from segmentation import TIERS, get_session, infer_alpha, quantized_path
+
+IMAGE_EXTS = {".png", ".jpg", ".jpeg"}
+
+
+def mask_iou(a, b, threshold: int = 128) -> float:
+    """兩張 L 模式遮罩的 IoU"""
+    if a.size != b.size:
+        b = b.resize(a.size)
+    a_bin = np.asarray(a) >= threshold
+    b_bin = np.asarray(b) >= threshold
+    union = np.logical_or(a_bin, b_bin).sum()
+    return float(np.logical_and(a_bin, b_bin).sum() / union) if union else 1.0
+
+
+def run_mask(img, model_name: str, quantized: bool):
+    return infer_alpha(img, get_session(model_name, quantized=quantized))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="rembg 模型延遲 / IoU 比較")
+    parser.add_argument("samples", type=Path)
+    parser.add_argument("--models", nargs="+", default=sorted(set(TIERS.values()) | {"silueta"}))
+    parser.add_argument("--reference", default=TIERS["final"])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    images = sorted(
+        p for p in args.samples.iterdir()
+        if p.suffix.lower() in IMAGE_EXTS and not p.stem.endswith("_mask")
+    )
+    if not images:
+        print(f"找不到測試圖：{args.samples}")
+        return 1
+
+    samples = []
+    for p in images:
+        img = load_upload(p.read_bytes())
+        gt_path = p.with_name(f"{p.stem}_mask.png")
+        if gt_path.exists():
+            gt = Image.open(gt_path).convert("L").resize(img.size)
+        else:
+            gt = run_mask(img, args.reference, quantized=False)
+        samples.append((p.name, img, gt))
+
+    configs = [(m, False) for m in args.models]
+    configs += [(m, True) for m in args.models if quantized_path(m).exists()]
+
+    print(f"{'model':<28}{'median ms':>12}{'p90 ms':>10}{'mean IoU':>10}{'min IoU':>10}")
+    for model_name, quantized in configs:
+        label = f"{model_name}{' int8' if quantized else ''}"
+        run_mask(samples[0][1], model_name, quantized)  # 暖機（載入模型）
+
+        times, ious = [], []
+        for _, img, gt in samples:
+            for _ in range(args.runs):
+                t0 = time.perf_counter()
+                mask = run_mask(img, model_name, quantized)
+                times.append((time.perf_counter() - t0) * 1000)
+            ious.append(mask_iou(gt, mask))
+
+        times.sort()
+        p90 = times[min(len(times) - 1, int(len(times) * 0.9))]
+        print(
+            f"{label:<28}{statistics.median(times):>12.0f}{p90:>10.0f}"
+            f"{statistics.mean(ious):>10.3f}{min(ious):>10.3f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+# column_width.py － 回報所在欄位的實際像素寬度（components/column_width）
+# 預覽圖依此縮圖後再送出，手機不必下載桌機解析度的合成圖
+
+from pathlib import Path
+
+import streamlit.components.v1 as components
+
+_COMPONENT_DIR = Path(__file__).resolve().parent / "components" / "column_width"
+_column_width = components.declare_component("column_width", path=str(_COMPONENT_DIR))
+
+WIDTH_STEP = 160          # 回報寬度的級距（px），避免拖拉視窗時頻繁重跑
+
+
+def column_width(key=None, step: int = WIDTH_STEP, max_width: int = 2400):
+    """目前欄位寬度（裝置像素，已依 step 進位）；瀏覽器尚未回報前為 None"""
+    return _column_width(step=step, max_width=max_width, key=key, default=None)
@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+# gang_sheet.py － DTF 膠膜排版（排產用）
+# 1) 讀取訂單（order_store）：各位置設計 × 總件數，依設計所在底圖的寬度換算實際印刷尺寸
+#    只排已確認（status = confirmed）的訂單；估價單在後台確認後才會進來
+# 2) 多筆訂單一起排到固定寬度的膠膜捲（預設 58 cm），skyline 排版、可 90° 旋轉
+# 3) 回報膠膜長度與使用率；可設定單張最長長度，超過自動開下一張
+# 4) 輸出 PNG 時逐段（band）合成、逐段壓縮寫檔，長捲也不會整張放進記憶體
+# 用法：
+#   python gang_sheet.py ORD-20250101120000-7KQ2MX ORD-20250101123000-H4WP9C [--out sheets/]
+#   python gang_sheet.py --since 2025-01-01 --until 2025-01-08 [--max-length 300] [--dpi 300]
+#   不給 --out 時只印排版報告
+
+import io
+import sys
+import hashlib
+import zlib
+import struct
+import argparse
+from pathlib import Path
+
+from PIL import Image
+
+from imaging import trim_transparent, print_size_mm
+from products import PRODUCT_CATALOG
+
+ROLL_WIDTH_CM = 58.0      # 膠膜寬度
+EDGE_CM = 1.0             # 左右留邊（進料 / 夾具）
+GAP_CM = 0.8              # 圖與圖之間的裁切間距
+DPI = 300
+BAND_PX = 1024            # 每次合成的高度（px）
+
+
+def _mm(cm: float) -> int:
+    return int(round(cm * 10))
+
+
+def _px(mm: int, dpi: int) -> int:
+    return max(1, int(round(mm / 25.4 * dpi)))
+
+
+# ==========================================
+# 1. 訂單 → 印刷件
+# ==========================================
+def load_print_image(file_bytes: bytes, apply_rb: bool):
+    """印刷用原圖：不縮到工作解析度，去背用 final 分級"""
+    img = Image.open(io.BytesIO(file_bytes)).convert("RGBA")
+    if apply_rb:
+        from segmentation import remove_background
+
+        img = remove_background(img, "final")
+    return trim_transparent(img)
+
+
+def order_jobs(order: dict, images: dict):
+    """
+    一筆訂單的印刷件：每個設計位置 × 訂單總件數
+    - images：{(sha256, rb): 印刷用原圖} 共用快取，同一張圖跨訂單只處理一次
+    回傳 [{order_id, design_key, image_key, w_mm, h_mm, copies}, ...]
+    """
+    item = PRODUCT_CATALOG.get(order["series"], {}).get(order["style"])
+    if item is None:
+        raise KeyError(f"{order['order_id']}：找不到款式 {order['series']} / {order['style']}")
+
+    copies = sum(int(n) for n in order["size_counts"].values())
+    jobs = []
+    if copies <= 0:
+        return jobs
+    for d_key, d_val in order["designs"].items():
+        image_key = (hashlib.sha256(d_val["bytes"]).hexdigest(), bool(d_val["rb"]))
+        if image_key not in images:
+            images[image_key] = load_print_image(d_val["bytes"], d_val["rb"])
+        img = images[image_key]
+        # sz 是設計所在那張底圖上的像素寬（同款各顏色 / 正反面解析度不同）
+        side = d_key.split("_", 1)[0]
+        size = print_size_mm(item, side, order.get("base_widths", {}).get(side), d_val["sz"], img.size)
+        if size is None:
+            raise ValueError(f"{order['order_id']} {d_key}：缺少底圖寬度或 mockup_width_cm，無法換算實際尺寸")
+        # 膠膜上一律不旋轉；rot 是燙印到衣服上的角度
+        w_mm, h_mm = size
+        jobs.append(
+            {
+                "order_id": order["order_id"],
+                "design_key": d_key,
+                "image_key": image_key,
+                "w_mm": w_mm,
+                "h_mm": h_mm,
+                "copies": copies,
+            }
+        )
+    return jobs
+
+
+# ==========================================
+# 2. Skyline 排版
+# ==========================================
+class _Skyline:
+    """單張膠膜的天際線；座標單位 mm，原點在左上（進料方向往下）"""
+
+    def __init__(self, width: int, max_length: int = None):
+        self.width = width
+        self.max_length = max_length
+        self.segments = [[0, 0, width]]   # [x, y, w]
+        self.length = 0
+
+    def _fit(self, i: int, w: int, h: int):
+        x = self.segments[i][0]
+        if x + w > self.width:
+            return None
+        y = 0
+        remain = w
+        j = i
+        while remain > 0:
+            y = max(y, self.segments[j][1])
+            remain -= self.segments[j][2]
+            j += 1
+        if self.max_length is not None and y + h > self.max_length:
+            return None
+        return y
+
+    def find(self, w: int, h: int, allow_rotate: bool = True):
+        """bottom-left：頂端最低者優先，其次靠左；回傳 (x, y, w, h) 或 None"""
+        best = None
+        shapes = [(w, h), (h, w)] if allow_rotate and w != h else [(w, h)]
+        for i in range(len(self.segments)):
+            for sw, sh in shapes:
+                y = self._fit(i, sw, sh)
+                if y is None:
+                    continue
+                cand = (y + sh, self.segments[i][0], y, sw, sh)
+                if best is None or cand < best:
+                    best = cand
+        if best is None:
+            return None
+        _, x, y, sw, sh = best
+        return x, y, sw, sh
+
+    def place(self, x: int, y: int, w: int, h: int):
+        segs = self.segments
+        new = [x, y + h, w]
+        out = []
+        for sx, sy, sw in segs:
+            end = sx + sw
+            if end <= x or sx >= x + w:
+                out.append([sx, sy, sw])
+                continue
+            if sx < x:
+                out.append([sx, sy, x - sx])
+            if end > x + w:
+                out.append([x + w, sy, end - (x + w)])
+        out.append(new)
+        out.sort()
+        # 相鄰同高合併，線段數才不會無限增加
+        merged = [out[0]]
+        for seg in out[1:]:
+            if seg[1] == merged[-1][1]:
+                merged[-1][2] += seg[2]
+            else:
+                merged.append(seg)
+        self.segments = merged
+        self.length = max(self.length, y + h)
+
+
+def fits_roll(job: dict, roll_width_cm: float = ROLL_WIDTH_CM, max_length_cm: float = None,
+              edge_cm: float = EDGE_CM, gap_cm: float = GAP_CM) -> bool:
+    """印刷件正放或轉 90° 其中一種放得進膠膜（寬度 / 單張最長長度）"""
+    gap = _mm(gap_cm)
+    width = _mm(roll_width_cm) - 2 * _mm(edge_cm) + gap
+    limit = _mm(max_length_cm) + gap if max_length_cm else None
+    w, h = job["w_mm"] + gap, job["h_mm"] + gap
+    return any(sw <= width and (limit is None or sh <= limit) for sw, sh in ((w, h), (h, w)))
+
+
+def pack(jobs, roll_width_cm: float = ROLL_WIDTH_CM, max_length_cm: float = None,
+         edge_cm: float = EDGE_CM, gap_cm: float = GAP_CM):
+    """
+    把所有印刷件（含份數）排進膠膜
+    回傳 [{length_mm, used_mm2, placements: [{job, x, y, w, h, rotated}]}]，座標單位 mm（不含左右留邊）
+    """
+    usable = _mm(roll_width_cm) - 2 * _mm(edge_cm)
+    gap = _mm(gap_cm)
+    max_length = _mm(max_length_cm) if max_length_cm else None
+    # 每件外擴一個間距；最右 / 最下多出的間距在結算長度時扣回
+    width = usable + gap
+    limit = max_length + gap if max_length else None
+
+    pieces = []
+    for job in jobs:
+        if not fits_roll(job, roll_width_cm, max_length_cm, edge_cm, gap_cm):
+            raise ValueError(
+                f"{job['order_id']} {job['design_key']}：{job['w_mm'] / 10:.1f}×{job['h_mm'] / 10:.1f} cm 超出膠膜可印範圍"
+            )
+        pieces += [job] * job["copies"]
+    # 大的先排：長邊、再面積
+    pieces.sort(key=lambda j: (max(j["w_mm"], j["h_mm"]), j["w_mm"] * j["h_mm"]), reverse=True)
+
+    sheets = []
+    for job in pieces:
+        w, h = job["w_mm"] + gap, job["h_mm"] + gap
+        for sheet in sheets:
+            spot = sheet["sky"].find(w, h)
+            if spot:
+                break
+        else:
+            sheet = {"sky": _Skyline(width, limit), "placements": [], "used_mm2": 0}
+            sheets.append(sheet)
+            spot = sheet["sky"].find(w, h)
+        x, y, sw, sh = spot
+        sheet["sky"].place(x, y, sw, sh)
+        sheet["placements"].append(
+            {"job": job, "x": x, "y": y, "w": sw - gap, "h": sh - gap, "rotated": sw != w}
+        )
+        sheet["used_mm2"] += job["w_mm"] * job["h_mm"]
+
+    result = []
+    for sheet in sheets:
+        result.append(
+            {
+                "length_mm": max(0, sheet["sky"].length - gap),
+                "used_mm2": sheet["used_mm2"],
+                "placements": sheet["placements"],
+            }
+        )
+    return result
+
+
+def utilization(sheet: dict, roll_width_cm: float = ROLL_WIDTH_CM) -> float:
+    """圖案面積 / 膠膜面積（含左右留邊）"""
+    film = _mm(roll_width_cm) * sheet["length_mm"]
+    return sheet["used_mm2"] / film if film else 0.0
+
+
+# ==========================================
+# 3. 逐段輸出 PNG
+# ==========================================
+def _png_chunk(f, tag: bytes, data: bytes):
+    f.write(struct.pack(">I", len(data)))
+    f.write(tag)
+    f.write(data)
+    f.write(struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+
+def render_sheet(sheet: dict, images: dict, out_path, roll_width_cm: float = ROLL_WIDTH_CM,
+                 edge_cm: float = EDGE_CM, dpi: int = DPI, band_px: int = BAND_PX):
+    """
+    輸出透明底 RGBA PNG（含 DPI 資訊）
+    每次只合成 band_px 高的一段並直接壓縮寫入，記憶體用量與膠膜長度無關
+    """
+    width_px = _px(_mm(roll_width_cm), dpi)
+    height_px = _px(sheet["length_mm"], dpi)
+    edge_px = _px(_mm(edge_cm), dpi)
+
+    items = []
+    for pl in sheet["placements"]:
+        x0 = edge_px + _px(pl["x"], dpi)
+        y0 = _px(pl["y"], dpi)
+        items.append((y0, x0, _px(pl["w"], dpi), _px(pl["h"], dpi), pl))
+    items.sort(key=lambda t: t[0])
+
+    # 同一張圖同尺寸只縮放一次；只留目前段落會用到的
+    scaled = {}
+
+    def scaled_image(pl, w, h):
+        key = (pl["job"]["image_key"], w, h, pl["rotated"])
+        if key not in scaled:
+            img = images[pl["job"]["image_key"]]
+            if pl["rotated"]:
+                img = img.transpose(Image.Transpose.ROTATE_90)
+            scaled[key] = img.resize((w, h), Image.LANCZOS)
+        return scaled[key]
+
+    ppm = int(round(dpi / 0.0254))
+    comp = zlib.compressobj(6)
+    with open(out_path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        _png_chunk(f, b"IHDR", struct.pack(">IIBBBBB", width_px, height_px, 8, 6, 0, 0, 0))
+        _png_chunk(f, b"pHYs", struct.pack(">IIB", ppm, ppm, 1))
+
+        start = 0
+        for top in range(0, height_px, band_px):
+            bottom = min(height_px, top + band_px)
+            band = Image.new("RGBA", (width_px, bottom - top), (0, 0, 0, 0))
+            while start < len(items) and items[start][0] + items[start][3] <= top:
+                start += 1
+            live = set()
+            for y0, x0, w, h, pl in items[start:]:
+                if y0 >= bottom:
+                    break
+                if y0 + h <= top:
+                    continue
+                # 排版不重疊，直接覆蓋即可（不需 alpha 合成）
+                band.paste(scaled_image(pl, w, h), (x0, y0 - top))
+                live.add((pl["job"]["image_key"], w, h, pl["rotated"]))
+            for key in [k for k in scaled if k not in live]:
+                del scaled[key]
+
+            raw = band.tobytes()
+            stride = width_px * 4
+            rows = b"".join(b"\x00" + raw[r * stride:(r + 1) * stride] for r in range(band.height))
+            data = comp.compress(rows)
+            if data:
+                _png_chunk(f, b"IDAT", data)
+        _png_chunk(f, b"IDAT", comp.flush())
+        _png_chunk(f, b"IEND", b"")
+    return Path(out_path)
+
+
+# ==========================================
+# 4. 指令列
+# ==========================================
+def main(argv=None):
+    from order_store import STATUSES, open_store, load_order, list_order_ids
+
+    parser = argparse.ArgumentParser(description="DTF 膠膜排版（多筆訂單合併）")
+    parser.add_argument("order_ids", nargs="*")
+    parser.add_argument("--db", default=None, help="訂單資料庫（預設 data/orders.db）")
+    parser.add_argument("--since", help="建立時間起（YYYY-mm-dd）")
+    parser.add_argument("--until", help="建立時間迄（不含）")
+    parser.add_argument("--any-status", action="store_true", help="連未確認的估價單也排（試排用）")
+    parser.add_argument("--roll-width", type=float, default=ROLL_WIDTH_CM, help="膠膜寬度 cm")
+    parser.add_argument("--max-length", type=float, default=None, help="單張最長 cm（預設整捲不裁）")
+    parser.add_argument("--gap", type=float, default=GAP_CM, help="圖與圖間距 cm")
+    parser.add_argument("--dpi", type=int, default=DPI)
+    parser.add_argument("--out", type=Path, help="輸出資料夾（不給則只印報告）")
+    args = parser.parse_args(argv)
+
+    conn = open_store(args.db)
+    order_ids = list(args.order_ids)
+    if args.since or args.until:
+        status = None if args.any_status else "confirmed"
+        order_ids += [oid for oid in list_order_ids(conn, args.since, args.until, status) if oid not in order_ids]
+    if not order_ids:
+        print("沒有要排版的訂單")
+        return 1
+
+    # 單筆訂單有問題（款式下架、缺尺寸資料、圖太大）只略過該筆，其餘照排
+    images = {}
+    jobs = []
+    packed_ids = []
+    skipped = []
+    for oid in order_ids:
+        order = load_order(conn, oid)
+        if order is None:
+            skipped.append(f"{oid}：找不到訂單")
+            continue
+        if order["status"] != "confirmed" and not args.any_status:
+            skipped.append(f"{oid}：尚未確認（{STATUSES.get(order['status'], order['status'])}）")
+            continue
+        try:
+            order_job_list = order_jobs(order, images)
+        except (KeyError, ValueError) as e:
+            skipped.append(str(e.args[0]) if e.args else oid)  # 訊息本身已含訂單編號
+            continue
+        too_big = [j for j in order_job_list if not fits_roll(j, args.roll_width, args.max_length, gap_cm=args.gap)]
+        if too_big:
+            skipped.append(
+                f"{oid}：{'、'.join(j['design_key'] for j in too_big)} 超出膠膜可印範圍"
+            )
+            continue
+        jobs += order_job_list
+        packed_ids.append(oid)
+
+    for msg in skipped:
+        print(f"略過 {msg}")
+    if not jobs:
+        print("沒有可排版的印刷件")
+        return 1
+
+    sheets = pack(jobs, args.roll_width, args.max_length, gap_cm=args.gap)
+    total_len = sum(s["length_mm"] for s in sheets)
+    total_used = sum(s["used_mm2"] for s in sheets)
+    print(f"訂單 {len(packed_ids)} 筆．印刷件 {sum(j['copies'] for j in jobs)} 片．膠膜 {len(sheets)} 張")
+    for i, sheet in enumerate(sheets, 1):
+        print(
+            f"  #{i:02d}  長 {sheet['length_mm'] / 10:7.1f} cm  "
+            f"{len(sheet['placements']):4d} 片  使用率 {utilization(sheet, args.roll_width):6.1%}"
+        )
+    film = _mm(args.roll_width) * total_len
+    print(f"合計 {total_len / 1000:.2f} m．平均使用率 {total_used / film if film else 0:.1%}")
+
+    if args.out:
+        args.out.mkdir(parents=True, exist_ok=True)
+        for i, sheet in enumerate(sheets, 1):
+            path = render_sheet(sheet, images, args.out / f"sheet_{i:02d}.png", args.roll_width, dpi=args.dpi)
+            print(f"已輸出 {path}")
+    return 1 if skipped else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
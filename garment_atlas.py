@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+# garment_atlas.py － 衣服底圖打包檔（mmap 共用）
+# 1) 離線把所有 {image_base}_{顏色}_{front/back} 底圖解碼成 RGBA，依序寫進一個打包檔
+# 2) 檔頭為 JSON 索引（位置 / 尺寸 / 來源檔 mtime），每張圖從 4 KB 邊界開始
+# 3) 執行時以 mmap 唯讀開啟，Image.frombuffer 直接指向 mmap，不解碼也不複製；
+#    多個 Streamlit process 共用同一份 page cache
+# 4) 來源圖更新過（mtime / 大小不符）或不在打包檔內時，呼叫端自行退回讀原檔
+# 重新打包：python garment_atlas.py [--assets assets] [--out data/garments.atlas]
+
+import os
+import sys
+import mmap
+import json
+import struct
+import argparse
+from pathlib import Path
+
+from PIL import Image
+
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_ATLAS_PATH = Path(os.environ.get("MOMO_GARMENT_ATLAS", BASE_DIR / "data" / "garments.atlas"))
+
+MAGIC = b"MOMOATL1"
+_HEADER = struct.Struct("<8sI")       # magic, 索引 JSON 長度
+PAGE = 4096
+IMAGE_EXTS = (".png", ".jpg", ".jpeg")
+SIDES = ("front", "back")
+
+
+def _align(n: int) -> int:
+    return (n + PAGE - 1) // PAGE * PAGE
+
+
+def _source_stamp(path: Path):
+    st = path.stat()
+    return [st.st_mtime_ns, st.st_size]
+
+
+def garment_sources(assets_dir: Path):
+    """依 PRODUCT_CATALOG 列出所有存在的底圖檔（與頁面上找檔的規則相同）"""
+    from products import PRODUCT_CATALOG
+
+    found = {}
+    for series in PRODUCT_CATALOG.values():
+        for item in series.values():
+            base_name = item.get("image_base", "")
+            if not base_name:
+                continue
+            color_map = item.get("color_map", {})
+            for color in item.get("colors", []):
+                file_key = color_map.get(color) or color
+                for side in SIDES:
+                    stem = f"{base_name}_{file_key}_{side}"
+                    for ext in IMAGE_EXTS:
+                        p = assets_dir / (stem + ext)
+                        if p.exists():
+                            found[p.name] = p
+    return [found[k] for k in sorted(found)]
+
+
+def build_atlas(assets_dir=None, out_path=None) -> Path:
+    """
+    解碼所有底圖寫成打包檔；先寫暫存檔再替換，
+    執行中的 process 仍映射舊檔（舊 inode），不會讀到寫一半的內容
+    """
+    assets_dir = Path(assets_dir) if assets_dir else BASE_DIR / "assets"
+    out_path = Path(out_path) if out_path else DEFAULT_ATLAS_PATH
+    sources = garment_sources(assets_dir)
+
+    decoded = []
+    for p in sources:
+        with Image.open(p) as im:
+            decoded.append((p, im.convert("RGBA")))
+
+    # 索引長度會影響資料起點：先以最大位數的 offset 估出檔頭大小，實際索引只會更短
+    entries = {
+        p.name: {"offset": 10 ** 15, "size": list(im.size), "source": _source_stamp(p)}
+        for p, im in decoded
+    }
+    offset = _align(_HEADER.size + len(json.dumps(entries).encode("utf-8")))
+    for p, im in decoded:
+        entries[p.name]["offset"] = offset
+        offset = _align(offset + im.width * im.height * 4)
+    index = json.dumps(entries).encode("utf-8")
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(index)))
+        f.write(index)
+        for p, im in decoded:
+            f.seek(entries[p.name]["offset"])
+            f.write(im.tobytes())
+        f.truncate(offset)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+class GarmentAtlas:
+    """唯讀 mmap 打包檔；get() 回傳的 Image 直接指向共用記憶體（readonly，要改請先 copy）"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"不是底圖打包檔：{self.path}")
+        self._index = json.loads(self._mm[_HEADER.size:_HEADER.size + index_len])
+        self._view = memoryview(self._mm)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, source_path):
+        """
+        依來源檔取出底圖；不在打包檔內或來源檔已更新時回傳 None
+        """
+        p = Path(source_path)
+        entry = self._index.get(p.name)
+        if entry is None:
+            return None
+        try:
+            if _source_stamp(p) != entry["source"]:
+                return None
+        except OSError:
+            pass  # 來源檔已移除：打包檔內仍有這張圖，照用
+        w, h = entry["size"]
+        start = entry["offset"]
+        buf = self._view[start:start + w * h * 4]
+        return Image.frombuffer("RGBA", (w, h), buf, "raw", "RGBA", 0, 1)
+
+
+def open_atlas(path=None):
+    """開啟打包檔；不存在或格式不符時回傳 None（呼叫端改讀原圖）"""
+    path = Path(path) if path else DEFAULT_ATLAS_PATH
+    if not path.exists():
+        return None
+    try:
+        return GarmentAtlas(path)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="打包衣服底圖（RGBA，mmap 共用）")
+    parser.add_argument("--assets", type=Path, default=BASE_DIR / "assets")
+    parser.add_argument("--out", type=Path, default=DEFAULT_ATLAS_PATH)
+    args = parser.parse_args(argv)
+
+    out = build_atlas(args.assets, args.out)
+    atlas = GarmentAtlas(out)
+    print(f"已打包 {len(atlas)} 張底圖 → {out}（{out.stat().st_size / 1024 / 1024:.1f} MB）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
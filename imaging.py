@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# imaging.py － 上傳圖檔前處理
+# 1) 縮到工作解析度（最寬 1200 px）
+# 2) 去背後裁掉透明邊框，只留實際圖案（縮放 / 旋轉 / 貼圖都少算空白像素）
+# 3) 依印刷位置的範圍（products.py 的 area）自動算出合適寬度；底圖像素 ↔ 實際公分換算
+# 4) 去背完成前的快速暫代遮罩（只供低解析度預覽）
+
+import io
+
+import numpy as np
+from PIL import Image
+
+MAX_WORK_WIDTH = 1200
+ALPHA_THRESHOLD = 8       # 去背殘留的極淡像素不算圖案
+
+
+def load_upload(file_bytes: bytes):
+    """讀取上傳圖檔並縮到工作解析度"""
+    img = Image.open(io.BytesIO(file_bytes)).convert("RGBA")
+    if img.width > MAX_WORK_WIDTH:
+        ratio = MAX_WORK_WIDTH / img.width
+        img = img.resize((MAX_WORK_WIDTH, int(img.height * ratio)))
+    return img
+
+
+def trim_transparent(img):
+    """
+    裁掉透明邊框
+    - 裁切位置記在 info["trim_box"]（原圖座標），原圖尺寸記在 info["source_size"]
+    - 全透明或沒有透明邊時原圖照回
+    """
+    lut = [0] * (ALPHA_THRESHOLD + 1) + [255] * (255 - ALPHA_THRESHOLD)
+    bbox = img.getchannel("A").point(lut).getbbox()
+    if not bbox or bbox == (0, 0, img.width, img.height):
+        return img
+
+    trimmed = img.crop(bbox)
+    trimmed.info["trim_box"] = bbox
+    trimmed.info["source_size"] = img.size
+    return trimmed
+
+
+def fit_to_area(img_size, area, min_w: int = 50, max_w: int = 400) -> int:
+    """等比例放進印刷範圍 (w, h) 時的寬度（對應調整面板的「縮放大小」）"""
+    w, h = img_size
+    aw, ah = area
+    scale = min(aw / w, ah / h)
+    return int(max(min_w, min(max_w, w * scale)))
+
+
+def px_per_cm(item: dict, side: str, base_width: int):
+    """
+    該面底圖每公分的像素數 = 底圖寬 ÷ mockup_width_cm[side]
+    同款不同顏色的底圖解析度不一，必須用設計實際所在那張底圖的寬度；未設定時回傳 None
+    """
+    cm = (item.get("mockup_width_cm") or {}).get(side)
+    if not cm or not base_width:
+        return None
+    return base_width / cm
+
+
+def print_size_mm(item: dict, side: str, base_width: int, sz: float, img_size):
+    """
+    設計實際印刷尺寸（mm，整數）：sz 為設計在底圖上的像素寬，高依圖案比例
+    詢價單 PDF 與 gang_sheet 排版共用，兩邊數字必須一致；無法換算時回傳 None
+    """
+    scale = px_per_cm(item, side, base_width)
+    if not scale:
+        return None
+    w, h = img_size
+    w_mm = int(round(sz / scale * 10))
+    return w_mm, max(1, int(round(w_mm * h / w)))
+
+
+def quick_matte(img, tol: int = 48):
+    """
+    去背模型還沒跑完時的暫代：四角中位色當背景色，色差越小越透明
+    只適合純色底的 Logo / 文字圖，結果僅用於低解析度預覽
+    """
+    rgb = np.asarray(img.convert("RGB"), dtype=np.int16)
+    corners = np.stack([rgb[0, 0], rgb[0, -1], rgb[-1, 0], rgb[-1, -1]])
+    bg = np.median(corners, axis=0)
+    dist = np.abs(rgb - bg).max(axis=2)
+    # tol/2 以下全透明、tol 以上全不透明，中間線性過渡，邊緣不會有硬鋸齒
+    ramp = np.clip((dist - tol / 2) * (510 / tol), 0, 255).astype(np.uint8)
+    out = img.copy()
+    out.putalpha(Image.fromarray(np.minimum(ramp, np.asarray(img.getchannel("A"))), "L"))
+    return out
@@ -9,15 +9,43 @@
 
 import io
 import os
-import json
+import hashlib
 import datetime
 from pathlib import Path
+from contextlib import contextmanager
 
 import streamlit as st
-import gspread
-from google.oauth2.service_account import Credentials
+from streamlit.errors import StreamlitAPIException
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from PIL import Image, ImageDraw, ImageFont
-from rembg import remove
+
+from quote_pdf import generate_inquiry_pdf
+from sheet_sync import connect_to_gsheet
+from segmentation import remove_background
+from imaging import load_upload, trim_transparent, fit_to_area, quick_matte, px_per_cm, print_size_mm
+from placement import design_placement, to_data_url, BASE_MAX_WIDTH, LAYER_MAX_WIDTH
+from column_width import column_width
+from static_media import build_all, static_url, img_tag
+from scheduler import Scheduler, QueueFull
+from garment_atlas import open_atlas
+from roster import (
+    TEMPLATE_CSV,
+    parse_roster,
+    count_sizes,
+    get_atlas,
+    render_all,
+    person_label,
+    contact_sheet,
+    build_zip,
+)
+from order_store import open_store, save_order, verify_order, load_order
+from pricing import (
+    SIZE_ORDER,
+    CP101_SIZE_ORDER,
+    calculate_unit_price,
+    calculate_cp101_price,
+    classify_plan,
+)
 
 # --- 從外部檔案匯入產品資料 ---
 try:
@@ -47,11 +75,6 @@ for p in [BASE_DIR / FONT_FILENAME, ASSETS_DIR / FONT_FILENAME]:
         font_path = str(p)
         break
 
-SCOPES = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive",
-]
-
 # 正反袖口對應（AG21000 用）
 SLEEVE_MAPPING = {
     "左臂 (Left Sleeve)": "左臂-後 (L.Sleeve Back)",
@@ -59,26 +82,29 @@ SLEEVE_MAPPING = {
 }
 
 # ==========================================
-# 連線 Google Sheet（支援 st.secrets 或環境變數）
+# 連線 Google Sheet（見 sheet_sync.py）
 # ==========================================
+sh = connect_to_gsheet()
+
+
 @st.cache_resource
-def connect_to_gsheet():
-    try:
-        if "gcp_service_account" in st.secrets:
-            info = st.secrets["gcp_service_account"]
-        elif "GCP_SERVICE_ACCOUNT" in os.environ:
-            info = json.loads(os.environ["GCP_SERVICE_ACCOUNT"])
-        else:
-            return None
+def get_order_store():
+    """本地訂單資料庫（正式來源）；路徑可用環境變數 MOMO_ORDER_DB 指定"""
+    return open_store(os.environ.get("MOMO_ORDER_DB") or None)
 
-        creds = Credentials.from_service_account_info(info, scopes=SCOPES)
-        gc = gspread.authorize(creds)
-        return gc.open("momo_db")
-    except Exception:
-        return None
 
+order_store = get_order_store()
 
-sh = connect_to_gsheet()
+def rerun_fragment():
+    """只重跑目前的 fragment；整頁執行中（不是 fragment 重跑）時退回整頁重跑"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+
+QUICK_PREVIEW_WIDTH = 320     # 快速預覽的底圖寬度
+PREVIEW_MAX_WIDTH = 960       # 瀏覽器尚未回報欄寬前的預覽上限
 
 # Session state 初始化
 if "designs" not in st.session_state:
@@ -89,89 +115,308 @@ if "uploader_keys" not in st.session_state:
 # ==========================================
 # 1. 影像處理引擎
 # ==========================================
-@st.cache_data(show_spinner=False)
-def process_user_image(uploaded_file_bytes, apply_rb: bool):
-    img = Image.open(io.BytesIO(uploaded_file_bytes)).convert("RGBA")
-    max_width = 1200
-    if img.width > max_width:
-        ratio = max_width / img.width
-        new_height = int(img.height * ratio)
-        img = img.resize((max_width, new_height))
+@st.cache_resource
+def get_scheduler():
+    """整個 process 共用的重運算排程（去背 / 合成 / 詢價單）"""
+    return Scheduler()
+
+
+@contextmanager
+def run_slot(op: str, key=None):
+    """
+    排程包裝：排隊時顯示目前順位；使用者重跑或離開頁面時，
+    更新順位的那一刻 Streamlit 會中斷本次執行，排隊也就跟著取消
+    """
+    ctx = get_script_run_ctx()
+    session_id = ctx.session_id if ctx else "local"
+    ph = None
+
+    def on_wait(pos: int):
+        nonlocal ph
+        if ph is None:
+            ph = st.empty()
+        ph.info(f"⏳ 目前使用人數較多，排隊中（第 {pos} 位）…")
 
+    try:
+        with get_scheduler().slot(op, session_id, key=key, on_wait=on_wait):
+            if ph is not None:
+                ph.empty()
+            yield
+    except QueueFull:
+        st.warning("⚠️ 目前使用人數較多，請稍後再試。")
+        st.stop()
+
+
+@st.cache_data(show_spinner=False)
+def _process_user_image(uploaded_file_bytes, apply_rb: bool, tier: str):
+    img = load_upload(uploaded_file_bytes)
     if apply_rb:
-        img = remove(img)
-    return img
+        img = remove_background(img, tier)
+    # 裁掉透明邊框：縮放大小以實際圖案為準，後續合成也少處理空白像素
+    return trim_transparent(img)
 
-# ==========================================
-# 2. 價格計算 + 品牌方案分級
-# ==========================================
-def calculate_unit_price(qty: int, is_double_sided: bool) -> int:
-    """一般棉T（例如 AG21000）價格：按件數＆是否雙面計算單價"""
-    if qty < 20:
-        return 0
-    price_s, price_d = 410, 560
-    if 30 <= qty < 50:
-        price_s, price_d = 380, 530
-    elif 50 <= qty < 100:
-        price_s, price_d = 360, 510
-    elif 100 <= qty < 300:
-        price_s, price_d = 340, 490
-    elif qty >= 300:
-        price_s, price_d = 320, 470
-    return price_d if is_double_sided else price_s
-
-
-def calculate_cp101_price(size_counts: dict):
+
+def process_user_image(uploaded_file_bytes, apply_rb: bool, tier: str = "preview"):
     """
-    CP101 吸濕排汗團體服價格計算：
-    - 依總件數判斷級距（10–30, 30–100, 100 以上）
-    - 小尺碼（XS–2XL）與大尺碼（3XL–5XL）單價不同
-    - 回傳：(平均單價, 總價, small_price, big_price, small_qty, big_qty)
+    tier：preview（即時預覽，小模型）/ final（詢價單與印刷輸出，高品質模型）
+    去背需排程；同一張圖去背過一次之後直接讀快取，不再排隊
     """
-    total_qty = int(sum(size_counts.values()))
-    if total_qty < 20:
-        return 0, 0, 0, 0, 0, 0  # 系統最低訂購量 20 件
+    if not apply_rb:
+        return _process_user_image(uploaded_file_bytes, False, "preview")
+    with run_slot("segment", _segment_key(uploaded_file_bytes, tier)):
+        return _process_user_image(uploaded_file_bytes, True, tier)
+
+
+def _segment_key(file_bytes: bytes, tier: str):
+    return hashlib.sha1(file_bytes).hexdigest(), tier
+
+
+def segmentation_pending(layers, tier: str = "preview") -> bool:
+    """這些圖層中是否有去背還沒算過的（要跑模型，需要先給低解析度預覽）"""
+    scheduler = get_scheduler()
+    return any(
+        d_val["rb"] and not scheduler.is_done("segment", _segment_key(d_val["bytes"], tier))
+        for _, d_val in layers
+    )
+
+
+def default_design_width(file_bytes: bytes, apply_rb: bool, pos_info: dict) -> int:
+    """依印刷範圍（products.py 的 area）自動決定初始寬度；未設定範圍時維持 150"""
+    if "area" not in pos_info:
+        return 150
+    return fit_to_area(process_user_image(file_bytes, apply_rb).size, pos_info["area"])
+
+
+@st.cache_resource
+def get_garment_atlas():
+    """底圖打包檔（python garment_atlas.py 產生）；沒有打包檔時為 None"""
+    return open_atlas()
+
+
+def load_garment(path: str):
+    """
+    載入衣服底圖；找不到檔案時回傳灰底提示圖
+    - 優先取打包檔的 mmap 唯讀圖（不解碼），要修改請先 copy()
+    """
+    atlas = get_garment_atlas()
+    if path and atlas is not None:
+        img = atlas.get(path)
+        if img is not None:
+            return img
+    if path and os.path.exists(path):
+        return Image.open(path).convert("RGBA")
+    base = Image.new("RGBA", (600, 800), (220, 220, 220))
+    draw_tmp = ImageDraw.Draw(base)
+    draw_tmp.text((50, 350), "Image Missing in Assets", fill="red")
+    return base
+
+
+def compose_side(item, side: str, base_path: str, designs: dict, tier: str = "preview"):
+    """
+    將所有設計套到指定面（front / back）的衣服上
+    - 背面會一併畫出正面袖子設計（SLEEVE_MAPPING）
+    - tier：去背模型分級（見 segmentation.py）
+    """
+    # 先備妥各圖層（去背各自排程），再佔用合成名額，避免拿著合成名額等去背
+    layers = [
+        (target_pos, d_val, process_user_image(d_val["bytes"], d_val["rb"], tier))
+        for target_pos, d_val in side_layers(item, side, designs)
+    ]
+
+    with run_slot("compose"):
+        return _paste_layers(load_garment(base_path).copy(), layers)
+
+
+def side_layers(item, side: str, designs: dict):
+    """指定面要畫的設計：[(印刷位置, 設計參數)]；背面含正面袖子（SLEEVE_MAPPING）"""
+    layers = []
+    for d_key, d_val in designs.items():
+        d_side, d_pos_name = d_key.split("_", 1)
+        target_pos = None
+
+        if d_side == side:
+            target_pos = item.get(f"pos_{side}", {}).get(d_pos_name)
+        elif side == "back" and d_side == "front" and d_pos_name in SLEEVE_MAPPING:
+            target_pos = item.get("pos_back", {}).get(SLEEVE_MAPPING[d_pos_name])
+
+        if target_pos:
+            layers.append((target_pos, d_val))
+    return layers
+
+
+def compose_quick(item, side: str, base_path: str, designs: dict, width: int = QUICK_PREVIEW_WIDTH):
+    """
+    低解析度快速預覽（不排程、不跑模型）：
+    底圖與圖層先縮小再合成；待去背的圖層以 quick_matte 暫代
+    """
+    base = load_garment(base_path)
+    q = min(1.0, width / base.width)
+    final = base.resize((max(1, int(base.width * q)), max(1, int(base.height * q))), Image.BILINEAR)
+
+    layers = []
+    for target_pos, d_val in side_layers(item, side, designs):
+        img = Image.open(io.BytesIO(d_val["bytes"]))
+        img.draft("RGB", (int(d_val["sz"] * q) * 2, int(d_val["sz"] * q) * 2))  # JPEG 直接以縮小尺寸解碼
+        img = img.convert("RGBA")
+        img.thumbnail((max(1, int(d_val["sz"] * q) * 2),) * 2)
+        if d_val["rb"]:
+            img = quick_matte(img)
+        tx, ty = target_pos["coords"]
+        layers.append((
+            {"coords": (tx * q, ty * q)},
+            {"sz": max(1, int(d_val["sz"] * q)), "rot": d_val["rot"], "ox": d_val["ox"] * q, "oy": d_val["oy"] * q},
+            trim_transparent(img),
+        ))
+    return _paste_layers(final, layers)
+
+
+def preview_composite(item, side: str, base_path: str, designs: dict):
+    """
+    預覽用原尺寸合成圖；最近一次的結果留在 session_state（只留目前這一面）
+    設計沒變時（例如欄位寬度剛回報、切換拖曳模式）重跑只需 fit_width 縮圖，不重新合成
+    """
+    sig = (
+        side,
+        base_path,
+        tuple(
+            (d_key, _segment_key(d_val["bytes"], "preview")[0]) + tuple(d_val[k] for k in ("rb", "sz", "rot", "ox", "oy"))
+            for d_key, d_val in designs.items()
+        ),
+    )
+    cached = st.session_state.get("preview_composite")
+    if cached and cached[0] == sig:
+        return cached[1]
+    final = compose_side(item, side, base_path, designs)
+    st.session_state["preview_composite"] = (sig, final)
+    return final
+
+
+def fit_width(img, width):
+    """縮到欄位寬度再送出；width 為 None（尚未回報）時用 PREVIEW_MAX_WIDTH"""
+    width = width or PREVIEW_MAX_WIDTH
+    if img.width <= width:
+        return img
+    return img.resize((width, max(1, int(img.height * width / img.width))), Image.LANCZOS)
+
+
+def _paste_layers(final, layers):
+    for target_pos, d_val, p_img in layers:
+        tx, ty = target_pos["coords"]
+
+        wr = d_val["sz"] / p_img.width
+        p_img = p_img.resize((d_val["sz"], int(p_img.height * wr)))
+
+        if d_val["rot"] != 0:
+            p_img = p_img.rotate(d_val["rot"], expand=True)
+
+        final.paste(
+            p_img,
+            (
+                int(tx - p_img.width / 2 + d_val["ox"]),
+                int(ty - p_img.height / 2 + d_val["oy"]),
+            ),
+            p_img,
+        )
+    return final
 
-    small_sizes = ["XS", "S", "M", "L", "XL", "2XL"]
-    big_sizes = ["3XL", "4XL", "5XL"]
 
-    small_qty = int(sum(size_counts.get(s, 0) for s in small_sizes))
-    big_qty = int(sum(size_counts.get(s, 0) for s in big_sizes))
+@st.cache_resource
+def get_static_media():
+    """顯示用縮圖（每個 process 只檢查 / 產生一次）；{名稱: (static 檔名, 雜湊) 或 None}"""
+    return build_all()
+
 
-    # 依總件數決定單價
-    if total_qty <= 30:
-        small_price, big_price = 255, 265
-    elif total_qty <= 100:
-        small_price, big_price = 245, 255
+def show_static_image(name: str, caption: str = "") -> bool:
+    """
+    以靜態檔網址顯示（瀏覽器快取，不經 websocket）；找不到原檔時回傳 False
+    未開啟 enableStaticServing 時退回 st.image 傳縮圖
+    """
+    built = get_static_media().get(name)
+    if built is None:
+        return False
+    filename, digest = built
+    if st.get_option("server.enableStaticServing"):
+        st.markdown(img_tag(static_url(filename, digest), caption), unsafe_allow_html=True)
     else:
-        small_price, big_price = 240, 250
+        st.image(str(BASE_DIR / "static" / filename), caption=caption or None)
+    return True
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def asset_listing():
+    """系統診斷用：assets 檔案清單（5 分鐘更新一次，不必每次重跑都掃資料夾）"""
+    try:
+        return sorted(os.listdir(str(ASSETS_DIR)))
+    except OSError:
+        return []
 
-    total_price = small_qty * small_price + big_qty * big_price
-    avg_unit_price = round(total_price / total_qty) if total_qty > 0 else 0
 
-    return avg_unit_price, total_price, small_price, big_price, small_qty, big_qty
+@st.cache_data(show_spinner=False)
+def garment_data_url(path: str):
+    return to_data_url(load_garment(path), BASE_MAX_WIDTH)
+
+
+@st.cache_data(show_spinner=False)
+def _design_layer_url(file_bytes: bytes, apply_rb: bool):
+    p_img = _process_user_image(file_bytes, apply_rb, "preview")
+    return to_data_url(p_img, LAYER_MAX_WIDTH), p_img.height / p_img.width
 
 
-def classify_plan(qty: int, is_double_sided: bool):
+def design_layer_url(file_bytes: bytes, apply_rb: bool):
+    """拖曳元件用的圖層（data URL, 高寬比）；先走排程去背，編碼部分再讀快取"""
+    process_user_image(file_bytes, apply_rb)
+    return _design_layer_url(file_bytes, apply_rb)
+
+
+def render_placement(item, side: str, base_path: str):
     """
-    品牌分級：
-    - 20–49：團體款 Team Edition
-    - 50–99：企業款 Corporate Edition
-    - 100+ 或 雙面印刷：品牌款 Brand Edition
+    拖曳式擺放：本面設計當作可拖曳圖層，其餘（例如背面的正面袖子）先合成進底圖
+    按下元件內「確認套用」後才寫回 st.session_state["designs"]
     """
-    if qty < 20:
-        return None, None
-
-    if qty >= 100 or is_double_sided:
-        name = "品牌款 Brand Edition"
-        desc = "適合有明確品牌定位、需要一體化形象與高識別度的企業 / 品牌專案。"
-    elif qty >= 50:
-        name = "企業款 Corporate Edition"
-        desc = "適合公司制服、活動識別服，重視團隊感與一致的品牌觀感。"
+    designs = st.session_state["designs"]
+    editable = {k: d for k, d in designs.items() if k.startswith(side + "_")}
+    fixed = {k: d for k, d in designs.items() if k not in editable}
+
+    if fixed:
+        base = compose_side(item, side, base_path, fixed)
+        base_url = to_data_url(base, BASE_MAX_WIDTH)
+        base_size = base.size
     else:
-        name = "團體款 Team Edition"
-        desc = "適合班服、社團、活動紀念服，以高 CP 值完成一次性專案。"
-    return name, desc
+        base_url = garment_data_url(base_path)
+        base_size = load_garment(base_path).size
+
+    layers = []
+    for d_key, d_val in editable.items():
+        target_pos = item.get(f"pos_{side}", {}).get(d_key.split("_", 1)[1])
+        if not target_pos:
+            continue
+        src, aspect = design_layer_url(d_val["bytes"], d_val["rb"])
+        tx, ty = target_pos["coords"]
+        layers.append({
+            "key": d_key,
+            "src": src,
+            "cx": tx,
+            "cy": ty,
+            "aspect": aspect,
+            **{k: int(d_val[k]) for k in ("sz", "rot", "ox", "oy")},
+        })
+
+    rev_src = repr([side, base_path, base_url[-64:]] + [
+        (l["key"], l["sz"], l["rot"], l["ox"], l["oy"], hashlib.sha1(l["src"].encode()).hexdigest()) for l in layers
+    ])
+    rev = hashlib.sha1(rev_src.encode()).hexdigest()
+
+    value = design_placement(base_url, base_size, layers, rev, key=f"placement_{side}")
+    if value and value.get("rev") == rev and value.get("ts") != st.session_state.get("placement_ts"):
+        st.session_state["placement_ts"] = value["ts"]
+        for d_key, upd in value.get("layers", {}).items():
+            if d_key in designs:
+                designs[d_key].update(upd)
+        rerun_fragment()
+
+# ==========================================
+# 2. 價格計算 + 品牌方案分級（見 pricing.py）
+# ==========================================
 
 # ==========================================
 # 3. 詢價單生成（圖片）
@@ -342,12 +587,119 @@ def generate_inquiry_image(img_front, img_back, data, unit_price: int):
     return card
 
 # ==========================================
-# 4. 寫入訂單資料
+# 3-2. 團體名單：名字 / 背號（見 roster.py）
+# ==========================================
+ROSTER_PREVIEW_PX = 96    # 預覽用字級（再縮放到設定寬度）
+ROSTER_PRINT_PX = 300     # 印刷用字級
+ROSTER_PRINT_DPI = 300
+ROSTER_PREVIEW_WIDTH = 600
+# 寬度設定以這些參考字為準，每個人字高一致（不會因為字少就被放大）
+ROSTER_REFERENCE = {"name": "王小明", "number": "88"}
+
+
+def roster_sizes(style: str):
+    return CP101_SIZE_ORDER if "CP101" in str(style) else SIZE_ORDER
+
+
+def import_roster(series: str, style: str, uploader_key: str):
+    """名單匯入（on_change 回呼）：依名單覆寫各尺寸件數"""
+    uf = st.session_state.get(uploader_key)
+    st.session_state.pop("roster_result", None)
+    if uf is None:
+        st.session_state.pop("roster", None)
+        return
+    sizes = roster_sizes(style)
+    rows, errors = parse_roster(uf.getvalue(), sizes)
+    st.session_state["roster"] = {"style": (series, style), "rows": rows}
+    if rows:
+        for size, n in count_sizes(rows, sizes).items():
+            st.session_state[f"qty_{series}_{style}_{size}"] = n
+    msg = f"✅ 已匯入 {len(rows)} 人，各尺寸件數已自動填入。" if rows else "⚠️ 名單沒有可用的資料。"
+    if errors:
+        msg += "\n\n" + "\n".join(f"- {e}" for e in errors[:10])
+    st.session_state["roster_msg"] = msg
+
+
+def render_roster(item, base_paths: dict, rows, layout: dict, fill: str):
+    """
+    產生每人預覽 + 印刷檔，回傳 (總覽表 JPEG, zip bytes)
+    - base_paths：{side: 底圖路徑}
+    - layout：{"name" / "number": (design_key, 參考字寬度, 上下偏移)}
+    """
+    texts = [r[field] for r in rows for field in layout]
+    preview_atlas = get_atlas(font_path, ROSTER_PREVIEW_PX)
+    print_atlas = get_atlas(font_path, ROSTER_PRINT_PX)
+    preview_atlas.preload(texts + list(ROSTER_REFERENCE.values()))
+    print_atlas.preload(texts + list(ROSTER_REFERENCE.values()))
+    preview_ref = {f: preview_atlas.render(ROSTER_REFERENCE[f], fill).width for f in layout}
+    print_ref = {f: print_atlas.render(ROSTER_REFERENCE[f], fill).width for f in layout}
+
+    # 上傳的共用設計每面只合成一次，每人只再貼文字
+    sides = [side for side in ("front", "back") if any(k.startswith(side + "_") for k, _, _ in layout.values())]
+    static = {side: compose_side(item, side, base_paths[side], st.session_state["designs"]) for side in sides}
+    # 每面各自的比例：同款不同顏色 / 正反面底圖解析度不同
+    scale = {side: px_per_cm(item, side, static[side].width) for side in sides}
+
+    def render_one(i, row):
+        files = {}
+        views = []
+        for side in sides:
+            layers = []
+            for field, (d_key, sz, oy) in layout.items():
+                if row[field] and d_key.startswith(side + "_"):
+                    target_pos = item[f"pos_{side}"][d_key.split("_", 1)[1]]
+                    img = preview_atlas.render(row[field], fill)
+                    d_val = {"sz": max(1, round(sz * img.width / preview_ref[field])), "rot": 0, "ox": 0, "oy": oy}
+                    layers.append((target_pos, d_val, img))
+            views.append(_paste_layers(static[side].copy(), layers))
+
+        preview = views[0]
+        if len(views) > 1:
+            preview = Image.new("RGBA", (sum(im.width for im in views), max(im.height for im in views)))
+            x = 0
+            for im in views:
+                preview.paste(im, (x, 0))
+                x += im.width
+        flat = Image.new("RGB", preview.size, "white")
+        flat.paste(preview, mask=preview.getchannel("A"))
+        preview = flat
+        preview.thumbnail((ROSTER_PREVIEW_WIDTH, ROSTER_PREVIEW_WIDTH))
+        stem = f"{i + 1:03d}_{person_label(row).replace(' ', '_')}"
+        buf = io.BytesIO()
+        preview.save(buf, format="JPEG", quality=85)
+        files[f"preview/{stem}.jpg"] = buf.getvalue()
+
+        # 印刷檔：依實際寬度（cm）輸出 300 DPI 透明 PNG
+        for field, (d_key, sz, _) in layout.items():
+            side_scale = scale.get(d_key.split("_", 1)[0])
+            if row[field] and side_scale:
+                img = print_atlas.render(row[field], fill)
+                w_px = max(1, round(sz * img.width / print_ref[field] / side_scale / 2.54 * ROSTER_PRINT_DPI))
+                img = img.resize((w_px, max(1, round(img.height * w_px / img.width))), Image.LANCZOS)
+                buf = io.BytesIO()
+                img.save(buf, format="PNG", dpi=(ROSTER_PRINT_DPI, ROSTER_PRINT_DPI))
+                files[f"print/{stem}_{field}.png"] = buf.getvalue()
+        return preview, files
+
+    with run_slot("render"):
+        results = render_all(rows, render_one)
+        sheet = contact_sheet([(person_label(r), p) for r, (p, _) in zip(rows, results)], font_path)
+
+    buf = io.BytesIO()
+    sheet.save(buf, format="JPEG", quality=85)
+    files = {"contact_sheet.jpg": buf.getvalue()}
+    for _, f in results:
+        files.update(f)
+    return files["contact_sheet.jpg"], build_zip(files)
+
+
+# ==========================================
+# 4. 寫入訂單資料（本地 SQLite 為主，Google Sheet 為鏡像）
 # ==========================================
-def add_order_to_db(data):
+def add_order_to_db(data, oid: str):
+    """將已存入本地資料庫的訂單鏡像一列到 Google Sheet"""
     if sh:
         try:
-            oid = f"ORD-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
             sh.worksheet("orders").append_row(
                 [
                     oid,
@@ -367,6 +719,34 @@ def add_order_to_db(data):
             return False
     return False
 
+def restore_order(order_id: str, phone: str):
+    """
+    追加訂單：把過往訂單的款式 / 尺寸 / 設計寫回 session_state（on_click 回呼，會在元件建立前執行）
+    - 回呼內再驗證一次訂單編號 + 手機
+    - 不回填姓名 / 電話 / LINE 等聯絡資料，由客人自行輸入
+    """
+    if verify_order(order_store, order_id, phone) is None:
+        return
+    order = load_order(order_store, order_id)
+    if not order:
+        return
+    series = order["series"]
+    style = order["style"]
+    if series not in PRODUCT_CATALOG or style not in PRODUCT_CATALOG[series]:
+        st.session_state["restore_msg"] = f"⚠️ 訂單 {order_id} 的款式已下架，無法還原。"
+    else:
+        st.session_state["sel_series"] = series
+        st.session_state["sel_style"] = style
+        if order["color"] in PRODUCT_CATALOG[series][style].get("colors", []):
+            st.session_state["sel_color"] = order["color"]
+        for size, n in order["size_counts"].items():
+            st.session_state[f"qty_{series}_{style}_{size}"] = int(n)
+
+        for d_key in set(st.session_state["designs"]) | set(order["designs"]):
+            st.session_state["uploader_keys"][d_key] = st.session_state["uploader_keys"].get(d_key, 0) + 1
+        st.session_state["designs"] = order["designs"]
+        st.session_state["restore_msg"] = f"✅ 已還原訂單 {order_id}，可直接調整數量後重新生成詢價單。"
+
 # ==========================================
 # 5. UI 佈局與品牌化呈現
 # ==========================================
@@ -383,10 +763,7 @@ st.markdown(
 
 # Sidebar
 with st.sidebar:
-    owner_path = ASSETS_DIR / "owner.jpg"
-    if owner_path.exists():
-        st.image(str(owner_path), caption="阿默｜興彰企業")
-    else:
+    if not show_static_image("owner", caption="阿默｜興彰企業"):
         st.info("💡 請上傳 owner.jpg 到 assets 資料夾")
 
     st.markdown("### 👨‍🔧 關於我們")
@@ -403,10 +780,11 @@ with st.sidebar:
         st.write(f"字型路徑: `{font_path}`")
         if ASSETS_DIR.exists():
             st.write("📁 assets 檔案：")
-            try:
-                st.code(os.listdir(str(ASSETS_DIR)))
-            except Exception:
-                pass
+            st.code(asset_listing())
+        st.write("🖼 靜態圖檔：")
+        st.code(get_static_media())
+        st.write("⚙️ 運算排程（執行中, 排隊中）：")
+        st.code(get_scheduler().stats())
         if st.button("手動重新整理網頁"):
             st.rerun()
 
@@ -427,9 +805,9 @@ st.markdown(
 ---
 
 ### ✅ 使用流程（4 步驟）
-1. **選擇產品 & 數量**
+1. **選擇產品 & 顏色**
 2. **上傳設計圖檔（可選智能去背）**
-3. **查看預估報價與方案分級**
+3. **輸入尺寸件數，查看預估報價與方案分級**
 4. **一鍵生成品牌級正式詢價單，存圖後傳 LINE：@727jxovv**
 """
 )
@@ -443,7 +821,31 @@ c1, c2 = st.columns([1.5, 1])
 # 右側：產品、尺寸、上傳
 # ==========================================
 with c2:
-    st.markdown("### 1️⃣ 選擇產品 & 數量")
+    with st.expander("🔁 追加訂單（查詢過往訂單）"):
+        st.caption("輸入訂單編號（ORD-…）與下單時的手機，可直接還原當時的款式、尺寸與設計。")
+        if "restore_msg" in st.session_state:
+            st.info(st.session_state.pop("restore_msg"))
+        rq1, rq2 = st.columns(2)
+        with rq1:
+            q_oid = st.text_input("訂單編號", key="reorder_oid", placeholder="ORD-…")
+        with rq2:
+            q_phone = st.text_input("下單手機", key="reorder_phone")
+        if q_oid and q_phone:
+            o = verify_order(order_store, q_oid, q_phone)
+            if o is None:
+                st.info("查無訂單，請確認訂單編號與手機。")
+            else:
+                st.markdown(
+                    f"**{o['order_id']}**｜{o['created_at'][:10]}｜{o['style']} / {o['color']}｜{o['qty']} 件"
+                )
+                st.button(
+                    "↩️ 還原此訂單",
+                    key=f"btn_restore_{o['order_id']}",
+                    on_click=restore_order,
+                    args=(o["order_id"], q_phone),
+                )
+
+    st.markdown("### 1️⃣ 選擇產品 & 顏色")
 
     if not PRODUCT_CATALOG:
         st.error("⚠️ 產品資料庫讀取失敗，請確認 products.py 是否語法正確。")
@@ -451,19 +853,19 @@ with c2:
 
     # 系列 / 款式
     series_list = list(PRODUCT_CATALOG.keys())
-    s = st.selectbox("系列", series_list)
+    s = st.selectbox("系列", series_list, key="sel_series")
 
     # 兼容：有些人 products.py 可能寫成「系列->款式->資料」，也可能直接「系列->資料」
     # 這裡以你原本結構：PRODUCT_CATALOG[系列] 是 dict，且其 keys 是「款式名稱」
     style_list = list(PRODUCT_CATALOG[s].keys())
-    v = st.selectbox("款式", style_list)
+    v = st.selectbox("款式", style_list, key="sel_style")
     item = PRODUCT_CATALOG.get(s, {}).get(v, {}) if isinstance(PRODUCT_CATALOG.get(s, {}), dict) else {}
 
     st.caption(f"🚀 {s}｜{v}｜興彰企業 x 默默文創")
 
     # 顏色
     color_options = item.get("colors", ["預設"])
-    selected_color_name = st.selectbox("顏色", color_options)
+    selected_color_name = st.selectbox("顏色", color_options, key="sel_color")
     color_code = item.get("color_map", {}).get(selected_color_name, "")
 
     base_name = item.get("image_base", "")
@@ -485,62 +887,9 @@ with c2:
 
     st.markdown("---")
     with st.expander("📏 查看尺寸表 (Size Chart)"):
-        sz_path = ASSETS_DIR / "size_chart.png"
-        if not sz_path.exists():
-            sz_path = ASSETS_DIR / "size_chart.jpg"
-        if sz_path.exists():
-            st.image(str(sz_path))
-        else:
+        if not show_static_image("size_chart"):
             st.warning("請上傳 size_chart 圖檔到 assets 資料夾（size_chart.png / size_chart.jpg）。")
 
-    # 尺寸輸入（CP101 支援 XS）
-    size_inputs = {}
-    st.markdown("### 尺寸件數設定")
-    st.caption("請依實際需求輸入各尺寸件數（**最低總數 20 件**）：")
-
-    is_cp101 = "CP101" in str(v)
-
-    if is_cp101:
-        rows = [("XS", "S"), ("M", "L"), ("XL", "2XL"), ("3XL", "4XL"), ("5XL", None)]
-    else:
-        rows = [("S", "M"), ("L", "XL"), ("2XL", "3XL"), ("4XL", "5XL")]
-
-    for left_size, right_size in rows:
-        if right_size is None:
-            cols = st.columns(1)
-            size_pair = (left_size,)
-        else:
-            cols = st.columns(2)
-            size_pair = (left_size, right_size)
-
-        for col, size in zip(cols, size_pair):
-            with col:
-                st.markdown(
-                    f"""
-<div style="
-    background-color:#F9FAFB;
-    border-radius:8px;
-    padding:6px 10px;
-    margin-bottom:4px;
-    border:1px solid #E1E4EA;
-">
-  <div style="font-size:10px;color:#A3A8B3;">SIZE</div>
-  <div style="font-size:16px;font-weight:600;">{size}</div>
-</div>
-""",
-                    unsafe_allow_html=True,
-                )
-
-                size_inputs[size] = st.number_input(
-                    label="",
-                    min_value=0,
-                    step=1,
-                    key=f"qty_{s}_{v}_{size}",  # 避免換款式時 key 衝突導致排序亂跳
-                    label_visibility="collapsed",
-                )
-
-    total_qty = int(sum(size_inputs.values()))
-
     # 2 創意設計 & 上傳
     st.markdown("### 2️⃣ 創意設計 & 上傳")
 
@@ -575,7 +924,7 @@ with c2:
                 st.session_state["designs"][design_key] = {
                     "bytes": file_bytes,
                     "rb": False,
-                    "sz": 150,
+                    "sz": default_design_width(file_bytes, False, pos_dict[pk]),
                     "rot": d_rot,
                     "ox": 0,
                     "oy": 0,
@@ -594,24 +943,83 @@ with c2:
     with tab_b:
         render_upload_ui(item.get("pos_back", {}), "back")
 
-    has_f = any(k.startswith("front_") for k in st.session_state["designs"].keys())
-    has_b = any(k.startswith("back_") for k in st.session_state["designs"].keys())
-    is_ds = bool(has_f and has_b)
-
-    # 報價：CP101 用專屬價，其餘用一般價
-    if is_cp101:
-        unit_price, total_price, cp_small_price, cp_big_price, cp_small_qty, cp_big_qty = calculate_cp101_price(size_inputs)
-    else:
-        unit_price = calculate_unit_price(total_qty, is_ds)
-        total_price = int(unit_price) * int(total_qty)
-        cp_small_price = cp_big_price = cp_small_qty = cp_big_qty = 0
-
-    plan_name, plan_desc = classify_plan(total_qty, is_ds)
+    with st.expander("🔤 名字 / 背號客製（團體名單匯入）"):
+        st.caption("上傳 CSV 名單（欄位：name, number, size），會自動填入各尺寸件數，並幫每位成員產生名字 / 背號預覽與印刷檔。")
+        st.download_button(
+            "⬇️ 下載名單範本（CSV）",
+            data=TEMPLATE_CSV.encode("utf-8-sig"),
+            file_name="roster_template.csv",
+            mime="text/csv",
+        )
+        roster_key = f"roster_{s}_{v}"
+        st.file_uploader(
+            "上傳名單（CSV）",
+            type=["csv"],
+            key=roster_key,
+            on_change=import_roster,
+            args=(s, v, roster_key),
+        )
+        if "roster_msg" in st.session_state:
+            st.info(st.session_state.pop("roster_msg"))
+
+        roster = st.session_state.get("roster")
+        pos_keys = [f"front_{p}" for p in item.get("pos_front", {})] + [f"back_{p}" for p in item.get("pos_back", {})]
+        if roster and roster["style"] == (s, v) and roster["rows"] and pos_keys:
+            rows = roster["rows"]
+            st.dataframe(rows, use_container_width=True, height=180)
+
+            def pos_label(k):
+                side, pos_name = k.split("_", 1)
+                return f"{'正面' if side == 'front' else '背面'}｜{pos_name}"
+
+            back_keys = [k for k in pos_keys if k.startswith("back_")] or pos_keys
+            name_default = next((k for k in back_keys if "上背" in k), back_keys[0])
+            rc1, rc2 = st.columns(2)
+            with rc1:
+                name_pos = st.selectbox("名字位置", pos_keys, index=pos_keys.index(name_default), format_func=pos_label)
+                number_pos = st.selectbox("背號位置", pos_keys, index=pos_keys.index(back_keys[0]), format_func=pos_label)
+                text_fill = st.color_picker("文字顏色", "#111111")
+            name_area = item[f"pos_{name_pos.split('_', 1)[0]}"][name_pos.split("_", 1)[1]].get("area", (200, 200))
+            number_area = item[f"pos_{number_pos.split('_', 1)[0]}"][number_pos.split("_", 1)[1]].get("area", (200, 200))
+            with rc2:
+                name_sz = st.slider("名字大小（3 字寬）", 50, 400, min(400, max(50, int(name_area[0] * 0.7))))
+                number_sz = st.slider("背號大小（2 碼寬）", 50, 400, min(400, max(50, int(number_area[0] * 0.5))))
+
+            # 同一位置：名字在上、背號在下
+            name_oy = number_oy = 0
+            if name_pos == number_pos:
+                name_oy = -int(name_area[1] * 0.3)
+                number_oy = int(name_area[1] * 0.1)
+            layout = {}
+            if any(r["name"] for r in rows):
+                layout["name"] = (name_pos, name_sz, name_oy)
+            if any(r["number"] for r in rows):
+                layout["number"] = (number_pos, number_sz, number_oy)
+
+            if not font_path:
+                st.warning("⚠ 找不到中文字型 NotoSansTC-Regular.ttf，無法產生名字 / 背號。")
+            elif st.button("🖨️ 產生每人預覽與印刷檔", use_container_width=True):
+                with st.spinner(f"正在產生 {len(rows)} 人的預覽與印刷檔..."):
+                    st.session_state["roster_result"] = render_roster(
+                        item, {"front": img_url_front, "back": img_url_back}, rows, layout, text_fill
+                    )
+
+            if "roster_result" in st.session_state:
+                sheet_bytes, zip_bytes = st.session_state["roster_result"]
+                st.image(sheet_bytes, caption="名單總覽", use_container_width=True)
+                st.download_button(
+                    "⬇️ 下載每人預覽 + 印刷檔（ZIP）",
+                    data=zip_bytes,
+                    file_name=f"roster_{datetime.date.today().strftime('%Y%m%d')}.zip",
+                    mime="application/zip",
+                    use_container_width=True,
+                )
 
 # ==========================================
-# 左側：即時預覽
+# 左側：即時預覽（fragment：切換視角 / 調整設計只重跑這一區）
 # ==========================================
-with c1:
+@st.fragment
+def preview_panel(item, v, selected_color_name, img_url_front, img_url_back):
     view_side = st.radio(
         "👁️ 預覽視角",
         ["正面 Front", "背面 Back"],
@@ -622,49 +1030,22 @@ with c1:
     st.markdown(f"#### 即時預覽：{v}｜{selected_color_name}")
 
     target_path = img_url_front if curr_side == "front" else img_url_back
-    if target_path and os.path.exists(target_path):
-        base = Image.open(target_path).convert("RGBA")
-    else:
-        base = Image.new("RGBA", (600, 800), (220, 220, 220))
-        draw_tmp = ImageDraw.Draw(base)
-        draw_tmp.text((50, 350), "Image Missing in Assets", fill="red")
-
-    final = base.copy()
-
-    # 套圖
-    for d_key, d_val in st.session_state["designs"].items():
-        d_side, d_pos_name = d_key.split("_", 1)
-        should_draw = False
-        target_pos = None
+    has_curr = any(k.startswith(curr_side + "_") for k in st.session_state["designs"])
+    drag_mode = st.toggle("🖱️ 拖曳調整模式（直接在預覽上移動、縮放、旋轉）", key="drag_mode")
 
-        if d_side == curr_side:
-            should_draw = True
-            target_pos = item.get(f"pos_{curr_side}", {}).get(d_pos_name)
-        elif curr_side == "back" and d_side == "front" and d_pos_name in SLEEVE_MAPPING:
-            target_pos = item.get("pos_back", {}).get(SLEEVE_MAPPING[d_pos_name])
-            should_draw = True
-
-        if should_draw and target_pos:
-            tx, ty = target_pos["coords"]
-            with st.spinner("Processing..."):
-                p_img = process_user_image(d_val["bytes"], d_val["rb"])
-
-            wr = d_val["sz"] / p_img.width
-            p_img = p_img.resize((d_val["sz"], int(p_img.height * wr)))
-
-            if d_val["rot"] != 0:
-                p_img = p_img.rotate(d_val["rot"], expand=True)
-
-            final.paste(
-                p_img,
-                (
-                    int(tx - p_img.width / 2 + d_val["ox"]),
-                    int(ty - p_img.height / 2 + d_val["oy"]),
-                ),
-                p_img,
-            )
-
-    st.image(final, use_container_width=True)
+    if drag_mode and has_curr:
+        with st.spinner("Processing..."):
+            render_placement(item, curr_side, target_path)
+    else:
+        # 漸進式預覽：需要跑去背時先送低解析度合成，精修完成後原地替換
+        col_px = column_width(key="preview_col_width")
+        ph = st.empty()
+        designs = st.session_state["designs"]
+        if segmentation_pending(side_layers(item, curr_side, designs)):
+            ph.image(compose_quick(item, curr_side, target_path, designs), use_container_width=True)
+        with st.spinner("Processing..."):
+            final = preview_composite(item, curr_side, target_path, designs)
+        ph.image(fit_width(final, col_px), use_container_width=True)
     st.markdown("---")
 
     # 調整面板
@@ -681,34 +1062,114 @@ with c1:
                         new_ox = st.number_input("左右微調 X", -200, 200, int(d_val["ox"]))
                     with c2a:
                         new_oy = st.number_input("上下微調 Y", -200, 200, int(d_val["oy"]))
-                    if st.form_submit_button("✅ 確認套用"):
+                    c1b, c2b = st.columns(2)
+                    with c1b:
+                        apply_clicked = st.form_submit_button("✅ 確認套用")
+                    with c2b:
+                        fit_clicked = st.form_submit_button("📐 符合印刷範圍")
+                    if apply_clicked:
                         d_val.update({"rb": new_rb, "sz": new_sz, "rot": new_rot, "ox": new_ox, "oy": new_oy})
-                        st.rerun()
+                        rerun_fragment()
+                    if fit_clicked:
+                        pos_info = item.get(f"pos_{curr_side}", {}).get(d_key.split("_", 1)[1], {})
+                        d_val.update({
+                            "rb": new_rb,
+                            "sz": default_design_width(d_val["bytes"], new_rb, pos_info),
+                            "rot": new_rot,
+                            "ox": 0,
+                            "oy": 0,
+                        })
+                        rerun_fragment()
+
+
+with c1:
+    preview_panel(item, v, selected_color_name, img_url_front, img_url_back)
 
 # ==========================================
-# 報價區
+# 報價區（fragment：改尺寸件數只重跑報價 / 方案 / 詢價單這一區）
 # ==========================================
-st.divider()
-st.markdown("### 3️⃣ 興彰嚴選報價 & 品牌分級")
-
-if total_qty < 20:
-    st.warning("⚠️ 最低訂製量為 20 件，請調整各尺寸件數。")
-else:
-    cp, cv = st.columns([1, 1.5])
-
-    with cp:
-        extra_cp101 = ""
-        if "CP101" in str(v):
-            extra_cp101 = (
-                f"<p style='font-size:12px;color:#666;margin-top:10px;'>"
-                f"CP101 計價：<br>"
-                f"小尺碼（XS–2XL）{cp_small_qty} 件 × NT$ {cp_small_price}｜"
-                f"大尺碼（3XL–5XL）{cp_big_qty} 件 × NT$ {cp_big_price}"
-                f"</p>"
-            )
+@st.fragment
+def quote_panel(s, v, item, selected_color_name, img_url_front, img_url_back):
+    st.markdown("### 3️⃣ 尺寸件數 & 興彰嚴選報價")
+    st.caption("請依實際需求輸入各尺寸件數（**最低總數 20 件**）：")
+
+    is_cp101 = "CP101" in str(v)
+    size_inputs = {}
+    c_size, c_quote = st.columns([1, 1.5])
+
+    # 尺寸輸入（CP101 支援 XS）
+    with c_size:
+        if is_cp101:
+            rows = [("XS", "S"), ("M", "L"), ("XL", "2XL"), ("3XL", "4XL"), ("5XL", None)]
+        else:
+            rows = [("S", "M"), ("L", "XL"), ("2XL", "3XL"), ("4XL", "5XL")]
+
+        for left_size, right_size in rows:
+            if right_size is None:
+                cols = st.columns(1)
+                size_pair = (left_size,)
+            else:
+                cols = st.columns(2)
+                size_pair = (left_size, right_size)
+
+            for col, size in zip(cols, size_pair):
+                with col:
+                    st.markdown(
+                        f"""
+<div style="
+    background-color:#F9FAFB;
+    border-radius:8px;
+    padding:6px 10px;
+    margin-bottom:4px;
+    border:1px solid #E1E4EA;
+">
+  <div style="font-size:10px;color:#A3A8B3;">SIZE</div>
+  <div style="font-size:16px;font-weight:600;">{size}</div>
+</div>
+""",
+                        unsafe_allow_html=True,
+                    )
+
+                    size_inputs[size] = st.number_input(
+                        label="",
+                        min_value=0,
+                        step=1,
+                        key=f"qty_{s}_{v}_{size}",  # 避免換款式時 key 衝突導致排序亂跳
+                        label_visibility="collapsed",
+                    )
+
+    total_qty = int(sum(size_inputs.values()))
+
+    has_f = any(k.startswith("front_") for k in st.session_state["designs"].keys())
+    has_b = any(k.startswith("back_") for k in st.session_state["designs"].keys())
+    is_ds = bool(has_f and has_b)
+
+    # 報價：CP101 用專屬價，其餘用一般價
+    if is_cp101:
+        unit_price, total_price, cp_small_price, cp_big_price, cp_small_qty, cp_big_qty = calculate_cp101_price(size_inputs)
+    else:
+        unit_price = calculate_unit_price(total_qty, is_ds)
+        total_price = int(unit_price) * int(total_qty)
+        cp_small_price = cp_big_price = cp_small_qty = cp_big_qty = 0
+
+    plan_name, plan_desc = classify_plan(total_qty, is_ds)
+
+    with c_quote:
+        if total_qty < 20:
+            st.warning("⚠️ 最低訂製量為 20 件，請調整各尺寸件數。")
+        else:
+            extra_cp101 = ""
+            if "CP101" in str(v):
+                extra_cp101 = (
+                    f"<p style='font-size:12px;color:#666;margin-top:10px;'>"
+                    f"CP101 計價：<br>"
+                    f"小尺碼（XS–2XL）{cp_small_qty} 件 × NT$ {cp_small_price}｜"
+                    f"大尺碼（3XL–5XL）{cp_big_qty} 件 × NT$ {cp_big_price}"
+                    f"</p>"
+                )
 
-        st.markdown(
-            f"""
+            st.markdown(
+                f"""
 <div style="background-color:#f8f9fa;padding:20px;border-radius:10px;text-align:center;">
   <p>本次估價所屬方案</p>
   <h4>{plan_name}</h4>
@@ -721,30 +1182,32 @@ else:
   {extra_cp101}
 </div>
 """,
-            unsafe_allow_html=True,
-        )
+                unsafe_allow_html=True,
+            )
 
-    with cv:
-        st.markdown(
-            f"""
+            st.markdown(
+                f"""
 - 🧩 **方案定位**：{plan_desc}
 - 🌈 **全彩印製**：高品質 DTF 數位膠膜，不限色數。
 - 🛡️ **免開版費**：報價已含基本印製費，適合少量多樣設計。
 - 📦 **獨立包裝**：每件含透明防塵袋，方便倉儲與發放。
 - 🚚 **工廠直營**：彰化在地生產，交期可控、品質穩定。
 """
-        )
+            )
+
+    if total_qty < 20:
+        return
 
     st.markdown("---")
     st.markdown("#### 4️⃣ 填寫聯絡資料，一鍵生成「品牌級正式詢價單」")
 
-    if st.checkbox("我接受此預估報價，並希望由專人協助確認與優化設計", value=False):
+    if st.checkbox("我接受此預估報價，並希望由專人協助確認與優化設計", value=False, key="accept_quote"):
         c1b, c2b = st.columns(2)
         with c1b:
-            c_name = st.text_input("您的稱呼 / 單位名稱")
-            c_line = st.text_input("LINE ID（用於傳圖與聯絡）")
+            c_name = st.text_input("您的稱呼 / 單位名稱", key="c_name")
+            c_line = st.text_input("LINE ID（用於傳圖與聯絡）", key="c_line")
         with c2b:
-            c_phone = st.text_input("手機號碼")
+            c_phone = st.text_input("手機號碼", key="c_phone")
             c_note = st.text_input("需求備註（顏色、風格、希望感覺等）")
 
         if st.button("🚀 生成正式詢價單（品牌專業版）", type="primary", use_container_width=True):
@@ -757,10 +1220,7 @@ else:
                 )
             else:
                 # 尺寸分佈字串（依固定順序輸出）
-                if "CP101" in str(v):
-                    size_order = ["XS", "S", "M", "L", "XL", "2XL", "3XL", "4XL", "5XL"]
-                else:
-                    size_order = ["S", "M", "L", "XL", "2XL", "3XL", "4XL", "5XL"]
+                size_order = CP101_SIZE_ORDER if "CP101" in str(v) else SIZE_ORDER
                 sz_br = ", ".join([f"{k}*{int(size_inputs.get(k, 0))}" for k in size_order if int(size_inputs.get(k, 0)) > 0])
 
                 dt = {
@@ -772,49 +1232,34 @@ else:
                     "size_breakdown": sz_br,
                     "series": s,
                     "variant": f"{v} / {selected_color_name}",
+                    "style": v,
+                    "color": selected_color_name,
                     "price": int(unit_price),
                     "promo_code": "MomoPro",
                     "note": c_note,
                 }
 
+                size_counts = {k: int(size_inputs.get(k, 0)) for k in size_order}
+                base_widths = {
+                    side: load_garment(path).width
+                    for side, path in (("front", img_url_front), ("back", img_url_back))
+                    if path
+                }
+                oid = save_order(order_store, dt, size_counts, st.session_state["designs"], base_widths)
+                dt["order_id"] = oid
                 if sh:
-                    add_order_to_db(dt)
+                    add_order_to_db(dt, oid)
 
-                # 產生背面合成圖
-                base_b = (
-                    Image.open(img_url_back).convert("RGBA")
-                    if img_url_back and os.path.exists(img_url_back)
-                    else Image.new("RGBA", (600, 800), (240, 240, 240))
-                )
-                final_b = base_b.copy()
-
-                for dk, dv in st.session_state["designs"].items():
-                    ds, dpn = dk.split("_", 1)
-                    tp = None
-                    if ds == "back":
-                        tp = item.get("pos_back", {}).get(dpn)
-                    elif ds == "front" and dpn in SLEEVE_MAPPING:
-                        tp = item.get("pos_back", {}).get(SLEEVE_MAPPING[dpn])
-                    if tp:
-                        tx, ty = tp["coords"]
-                        pimg = process_user_image(dv["bytes"], dv["rb"])
-                        wr = dv["sz"] / pimg.width
-                        pimg = pimg.resize((dv["sz"], int(pimg.height * wr)))
-                        if dv["rot"] != 0:
-                            pimg = pimg.rotate(dv["rot"], expand=True)
-                        final_b.paste(
-                            pimg,
-                            (
-                                int(tx - pimg.width / 2 + dv["ox"]),
-                                int(ty - pimg.height / 2 + dv["oy"]),
-                            ),
-                            pimg,
-                        )
+                # 產生正反面合成圖（不受目前預覽視角影響）
+                final_f = compose_side(item, "front", img_url_front, st.session_state["designs"], "final")
+                final_b = compose_side(item, "back", img_url_back, st.session_state["designs"], "final")
 
                 # 生成詢價單（已移除印刷位置清單）
-                receipt = generate_inquiry_image(final, final_b, dt, int(unit_price))
+                with run_slot("render"):
+                    receipt = generate_inquiry_image(final_f, final_b, dt, int(unit_price))
 
-                st.success("✅ 品牌級正式詢價單已生成！")
+                reorder_hint = "追加訂單時輸入此編號與手機即可查詢" if c_phone else "填寫手機才能於追加訂單時查詢"
+                st.success(f"✅ 品牌級正式詢價單已生成！訂單編號：{oid}（{reorder_hint}）")
                 st.image(receipt, caption="📩 請長按儲存此圖片，並傳給阿默 LINE: @727jxovv")
 
                 # 提供下載（手機更直覺，不用截圖）
@@ -828,7 +1273,36 @@ else:
                     use_container_width=True,
                 )
 
+                # PDF 版：向量文字、可列印，附各位置印刷明細與尺寸分佈
+                design_layers = []
+                for dk, dv in st.session_state["designs"].items():
+                    ds, dpn = dk.split("_", 1)
+                    layer = process_user_image(dv["bytes"], dv["rb"], "final")
+                    size_mm = print_size_mm(item, ds, base_widths.get(ds), dv["sz"], layer.size)
+                    design_layers.append((ds, dpn, layer, dv, size_mm))
+                with run_slot("render"):
+                    pdf_bytes = generate_inquiry_pdf(
+                        final_f,
+                        final_b,
+                        dt,
+                        int(unit_price),
+                        size_counts,
+                        design_layers,
+                        font_path,
+                    )
+                st.download_button(
+                    "⬇️ 下載詢價單（PDF 列印版）",
+                    data=pdf_bytes,
+                    file_name=f"estimate_{datetime.date.today().strftime('%Y%m%d')}.pdf",
+                    mime="application/pdf",
+                    use_container_width=True,
+                )
+
                 st.link_button(
                     "👉 開啟 LINE 加好友/傳送（@727jxovv）",
                     "https://line.me/ti/p/~@727jxovv",
                 )
+
+
+st.divider()
+quote_panel(s, v, item, selected_color_name, img_url_front, img_url_back)
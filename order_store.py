@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+# order_store.py － 本地訂單資料庫（SQLite）
+# 1) 每筆訂單完整保存：款式 / 顏色 / 尺寸件數 / 各位置設計參數
+# 2) 設計圖檔以內容雜湊（sha256）存一份，同一張圖重複下單不重複佔空間
+# 3) LINE ID / 手機 / 訂單編號皆有索引，追加訂單可毫秒級查回並還原
+#    （前台需「訂單編號 + 下單手機」兩者相符才查得到，避免他人以 LINE ID 查看個資；
+#     訂單編號帶隨機碼，不能由下單時間推算後逐一嘗試）
+# 4) 每次生成詢價單都會存一筆（狀態 quote）；後台確認成交後改為 confirmed 才進排產
+# Google Sheet 只是鏡像匯出，這裡才是訂單的正式來源
+
+import re
+import json
+import secrets
+import sqlite3
+import hashlib
+import datetime
+import threading
+from pathlib import Path
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parent / "data" / "orders.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id    TEXT PRIMARY KEY,
+    created_at  TEXT NOT NULL,
+    name        TEXT,
+    phone       TEXT,
+    phone_key   TEXT,
+    line_id     TEXT,
+    line_key    TEXT,
+    series      TEXT,
+    style       TEXT,
+    color       TEXT,
+    qty         INTEGER,
+    unit_price  INTEGER,
+    size_counts TEXT,
+    designs     TEXT,
+    base_widths TEXT,
+    status      TEXT NOT NULL DEFAULT 'quote',
+    note        TEXT,
+    promo_code  TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_orders_line_key ON orders(line_key, created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_phone_key ON orders(phone_key, created_at);
+
+CREATE TABLE IF NOT EXISTS design_blobs (
+    hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+"""
+
+# 舊資料庫補欄位（CREATE TABLE IF NOT EXISTS 不會幫既有資料表加欄位）
+MIGRATIONS = (
+    ("orders", "base_widths", "TEXT"),
+    ("orders", "status", "TEXT NOT NULL DEFAULT 'quote'"),
+)
+
+# 訂單狀態：估價（每次按生成詢價單）/ 已確認（排產）/ 已取消
+STATUSES = {"quote": "估價", "confirmed": "已確認", "cancelled": "已取消"}
+
+# 設計參數中需要保存的欄位（bytes 另存 design_blobs）
+DESIGN_FIELDS = ("rb", "sz", "rot", "ox", "oy")
+
+# 訂單編號隨機碼：去掉 0/O/1/I 等易混字元，客人手抄也不會打錯；6 碼約 10 億種組合
+ORDER_CODE_CHARS = "23456789ABCDEFGHJKLMNPQRSTUVWXYZ"
+ORDER_CODE_LEN = 6
+ORDER_ID_RE = re.compile(rf"ORD-\d{{14}}-[{ORDER_CODE_CHARS}]{{{ORDER_CODE_LEN}}}")
+
+_LOCK = threading.Lock()
+
+
+def phone_key(phone: str) -> str:
+    """手機只留數字，+886 開頭轉回 09 格式"""
+    digits = re.sub(r"\D", "", str(phone or ""))
+    if digits.startswith("886"):
+        digits = "0" + digits[3:]
+    return digits
+
+
+def line_key(line_id: str) -> str:
+    """LINE ID 不分大小寫、去掉前置 @"""
+    return str(line_id or "").strip().lstrip("@").lower()
+
+
+def new_order_id(now: datetime.datetime = None) -> str:
+    """ORD-YYYYmmddHHMMSS-隨機碼；時間部分方便人工排序對照，隨機碼才是查詢憑證"""
+    now = now or datetime.datetime.now()
+    code = "".join(secrets.choice(ORDER_CODE_CHARS) for _ in range(ORDER_CODE_LEN))
+    return f"ORD-{now.strftime('%Y%m%d%H%M%S')}-{code}"
+
+
+def open_store(path=None):
+    """開啟（或建立）訂單資料庫"""
+    db_path = Path(path) if path else DEFAULT_DB_PATH
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    _migrate(conn)
+    return conn
+
+
+def _migrate(conn):
+    with conn:
+        for table, column, decl in MIGRATIONS:
+            columns = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+        # 依賴新欄位的索引放在補欄位之後
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status, created_at)")
+
+
+def save_order(conn, data: dict, size_counts: dict, designs: dict, base_widths: dict = None) -> str:
+    """
+    寫入一筆訂單，回傳訂單編號（ORD-YYYYmmddHHMMSS-隨機碼，見 new_order_id）
+    - data：與詢價單相同的欄位（name / phone / line / series / style / color ...）
+    - designs：st.session_state["designs"] 的內容
+    - base_widths：{side: 設計所在底圖的像素寬}，設計的 sz 以此為準換算實際尺寸
+    """
+    design_state = {}
+    blobs = []
+    for d_key, d_val in designs.items():
+        h = hashlib.sha256(d_val["bytes"]).hexdigest()
+        blobs.append((h, d_val["bytes"]))
+        design_state[d_key] = {"hash": h, **{k: d_val[k] for k in DESIGN_FIELDS}}
+
+    now = datetime.datetime.now()
+    row = (
+        now.isoformat(timespec="seconds"),
+        data.get("name", ""),
+        data.get("phone", ""),
+        phone_key(data.get("phone", "")),
+        data.get("line", ""),
+        line_key(data.get("line", "")),
+        data.get("series", ""),
+        data.get("style", ""),
+        data.get("color", ""),
+        int(data.get("qty", 0)),
+        int(data.get("price", 0)),
+        json.dumps({k: int(n) for k, n in size_counts.items()}, ensure_ascii=False),
+        json.dumps(design_state, ensure_ascii=False),
+        json.dumps({k: int(w) for k, w in (base_widths or {}).items()}),
+        data.get("note", ""),
+        data.get("promo_code", ""),
+    )
+
+    with _LOCK, conn:
+        conn.executemany("INSERT OR IGNORE INTO design_blobs (hash, data) VALUES (?, ?)", blobs)
+        while True:
+            oid = new_order_id(now)
+            try:
+                conn.execute(
+                    "INSERT INTO orders (order_id, created_at, name, phone, phone_key, line_id, line_key,"
+                    " series, style, color, qty, unit_price, size_counts, designs, base_widths, note, promo_code)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (oid,) + row,
+                )
+                return oid
+            except sqlite3.IntegrityError:
+                continue
+
+
+def verify_order(conn, order_id: str, phone: str):
+    """
+    追加訂單查詢：訂單編號與下單手機都相符才回傳摘要（不含個資與設計圖檔），否則 None
+    LINE ID 常是公開的，不能單獨當作查詢憑證；不帶隨機碼的舊格式編號可由時間推算，一律不受理
+    """
+    oid = str(order_id or "").strip().upper()
+    pk = phone_key(phone)
+    if not ORDER_ID_RE.fullmatch(oid) or len(pk) < 8:
+        return None
+    cols = "order_id, created_at, series, style, color, qty, unit_price"
+    with _LOCK:
+        row = conn.execute(
+            f"SELECT {cols} FROM orders WHERE order_id = ? AND phone_key = ?", (oid, pk)
+        ).fetchone()
+    return dict(row) if row else None
+
+
+def load_order(conn, order_id: str):
+    """讀回完整訂單；designs 會還原成 session_state["designs"] 的格式（含 bytes）"""
+    with _LOCK:
+        row = conn.execute("SELECT * FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+        if row is None:
+            return None
+        order = dict(row)
+        design_state = json.loads(order["designs"] or "{}")
+        hashes = list({d["hash"] for d in design_state.values()})
+        blobs = {}
+        if hashes:
+            marks = ",".join("?" * len(hashes))
+            for r in conn.execute(f"SELECT hash, data FROM design_blobs WHERE hash IN ({marks})", hashes):
+                blobs[r["hash"]] = bytes(r["data"])
+
+    designs = {}
+    for d_key, d in design_state.items():
+        if d["hash"] in blobs:
+            designs[d_key] = {"bytes": blobs[d["hash"]], **{k: d[k] for k in DESIGN_FIELDS}}
+
+    order["size_counts"] = json.loads(order["size_counts"] or "{}")
+    order["base_widths"] = json.loads(order["base_widths"] or "{}")
+    order["designs"] = designs
+    return order
+
+
+def set_order_status(conn, order_id: str, status: str) -> bool:
+    """更新訂單狀態（STATUSES 的 key）；查無訂單時回傳 False"""
+    if status not in STATUSES:
+        raise ValueError(f"未知的訂單狀態：{status}")
+    with _LOCK, conn:
+        cur = conn.execute("UPDATE orders SET status = ? WHERE order_id = ?", (status, order_id))
+        return cur.rowcount > 0
+
+
+def recent_orders(conn, status: str = None, limit: int = 100):
+    """後台列表：最近的訂單摘要（新到舊），可依狀態篩選"""
+    sql = "SELECT order_id, created_at, name, style, color, qty, unit_price, status FROM orders"
+    params = []
+    if status:
+        sql += " WHERE status = ?"
+        params.append(status)
+    with _LOCK:
+        cur = conn.execute(sql + " ORDER BY created_at DESC LIMIT ?", params + [limit])
+        return [dict(r) for r in cur.fetchall()]
+
+
+def list_order_ids(conn, since: str = None, until: str = None, status: str = "confirmed"):
+    """
+    依建立時間列出訂單編號（舊到新），排產 / 批次處理用
+    - since / until：'YYYY-mm-dd' 或完整時間字串，until 不含當天以後
+    - status：預設只列已確認的訂單；None = 不限狀態
+    """
+    sql = "SELECT order_id FROM orders WHERE 1 = 1"
+    params = []
+    if status:
+        sql += " AND status = ?"
+        params.append(status)
+    if since:
+        sql += " AND created_at >= ?"
+        params.append(since)
+    if until:
+        sql += " AND created_at < ?"
+        params.append(until)
+    with _LOCK:
+        return [r["order_id"] for r in conn.execute(sql + " ORDER BY created_at", params)]
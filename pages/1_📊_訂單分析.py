@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+# 後台：訂單分析（僅管理者）
+# 資料來源：Google Sheet orders 工作表 → 增量同步到本地 SQLite → 累加統計
+
+import os
+
+import pandas as pd
+import streamlit as st
+
+from order_store import STATUSES, open_store, recent_orders, set_order_status
+from sheet_sync import connect_to_gsheet, ensure_schema, sync_orders, resync_orders, load_aggregates
+
+st.set_page_config(page_title="興彰 x 默默｜訂單分析", page_icon="📊", layout="wide")
+
+
+@st.cache_resource
+def get_order_store():
+    conn = open_store(os.environ.get("MOMO_ORDER_DB") or None)
+    ensure_schema(conn)
+    return conn
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def sync_recent(_sh, _conn):
+    """每分鐘最多同步一次，避免每次互動都打 Sheets API"""
+    return sync_orders(_sh, _conn)
+
+
+# ==========================================
+# 管理者驗證
+# ==========================================
+try:
+    admin_password = st.secrets.get("admin_password")
+except Exception:
+    admin_password = None
+admin_password = admin_password or os.environ.get("MOMO_ADMIN_PASSWORD")
+if not admin_password:
+    st.error("尚未設定管理者密碼（st.secrets['admin_password'] 或環境變數 MOMO_ADMIN_PASSWORD）。")
+    st.stop()
+
+if not st.session_state.get("is_admin"):
+    pw = st.text_input("管理者密碼", type="password")
+    if pw and pw == admin_password:
+        st.session_state["is_admin"] = True
+        st.rerun()
+    elif pw:
+        st.error("密碼錯誤。")
+    st.stop()
+
+# ==========================================
+# 同步
+# ==========================================
+st.markdown("# 📊 訂單分析")
+
+conn = get_order_store()
+sh = connect_to_gsheet()
+
+if sh is None:
+    st.warning("⚠️ 未連上 Google Sheet，以下為上次同步的資料。")
+else:
+    c_sync, c_btn = st.columns([3, 1])
+    with c_btn:
+        if st.button("🔄 立即同步", use_container_width=True):
+            sync_recent.clear()
+        if st.button("♻️ 重建統計", use_container_width=True, help="清掉本地副本，從 Google Sheet 第一列重新同步"):
+            try:
+                resync_orders(sh, conn)
+            except Exception as e:
+                st.error(f"重建失敗：{e}")
+            sync_recent.clear()
+    with c_sync:
+        try:
+            added = sync_recent(sh, conn)
+            st.caption(f"已同步 Google Sheet（本次新增 {added} 筆，每分鐘自動檢查一次）")
+        except Exception as e:
+            st.error(f"同步失敗：{e}")
+
+
+# ==========================================
+# 訂單確認（只有已確認的訂單會進 DTF 排版 gang_sheet.py）
+# ==========================================
+with st.expander("✅ 訂單確認（排產）", expanded=False):
+    st.caption("每次生成詢價單都會存一筆「估價」；客人確認下單後改為「已確認」，排版才會納入。")
+    status_filter = st.selectbox(
+        "狀態",
+        ["quote", "confirmed", "cancelled", None],
+        format_func=lambda k: STATUSES.get(k, "全部"),
+        key="status_filter",
+    )
+    rows = recent_orders(conn, status_filter)
+    if not rows:
+        st.info("沒有符合的訂單。")
+    else:
+        df_orders = pd.DataFrame(rows)
+        df_orders["status"] = df_orders["status"].map(STATUSES)
+        edited = st.data_editor(
+            df_orders,
+            hide_index=True,
+            use_container_width=True,
+            disabled=[c for c in df_orders.columns if c != "status"],
+            column_config={
+                "status": st.column_config.SelectboxColumn("狀態", options=list(STATUSES.values()), required=True),
+            },
+            key=f"orders_editor_{status_filter}",
+        )
+        if st.button("💾 儲存狀態"):
+            label_to_status = {v: k for k, v in STATUSES.items()}
+            changed = 0
+            for before, after in zip(rows, edited.to_dict("records")):
+                new_status = label_to_status[after["status"]]
+                if new_status != before["status"]:
+                    set_order_status(conn, before["order_id"], new_status)
+                    changed += 1
+            st.success(f"已更新 {changed} 筆訂單狀態。")
+
+
+def agg_frame(dim: str):
+    return pd.DataFrame(load_aggregates(conn, dim), columns=["項目", "詢價數", "件數", "報價金額"])
+
+
+# ==========================================
+# 總覽
+# ==========================================
+df_product = agg_frame("product")
+if df_product.empty:
+    st.info("目前沒有訂單資料。")
+    st.stop()
+
+st.caption("以下統計 Google Sheet 上的每一張詢價單（含未確認的估價），金額為各詢價單當時的報價。")
+m1, m2, m3 = st.columns(3)
+m1.metric("詢價數", f"{int(df_product['詢價數'].sum()):,}")
+m2.metric("詢價總件數", f"{int(df_product['件數'].sum()):,}")
+m3.metric("報價金額合計", f"NT$ {int(df_product['報價金額'].sum()):,}")
+
+st.divider()
+
+c1, c2 = st.columns(2)
+with c1:
+    st.markdown("#### 👕 商品")
+    st.bar_chart(df_product.set_index("項目")["件數"])
+    st.dataframe(df_product, hide_index=True, use_container_width=True)
+with c2:
+    st.markdown("#### 🏷️ 方案分級")
+    df_plan = agg_frame("plan")
+    st.bar_chart(df_plan.set_index("項目")["件數"])
+    st.dataframe(df_plan, hide_index=True, use_container_width=True)
+
+c3, c4 = st.columns(2)
+with c3:
+    st.markdown("#### 🎨 顏色")
+    st.dataframe(agg_frame("color"), hide_index=True, use_container_width=True)
+with c4:
+    st.markdown("#### 📏 尺寸分佈")
+    df_size = agg_frame("size").drop(columns=["報價金額"])
+    st.bar_chart(df_size.set_index("項目")["件數"])
+    st.dataframe(df_size, hide_index=True, use_container_width=True)
+
+st.markdown("#### 📅 月份")
+df_month = agg_frame("month").sort_values("項目")
+st.line_chart(df_month.set_index("項目")[["件數", "報價金額"]])
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# placement.py － 拖曳式設計擺放元件（components/placement）
+# 底圖與圖層只傳一次，拖曳 / 縮放 / 旋轉都在瀏覽器端完成，
+# 按「確認套用」才回傳 {design_key: {sz, rot, ox, oy}}，平常調整不觸發伺服器重跑
+
+import io
+import base64
+from pathlib import Path
+
+import streamlit.components.v1 as components
+from PIL import Image
+
+_COMPONENT_DIR = Path(__file__).resolve().parent / "components" / "placement"
+_design_placement = components.declare_component("design_placement", path=str(_COMPONENT_DIR))
+
+BASE_MAX_WIDTH = 800      # 底圖只需預覽畫質
+LAYER_MAX_WIDTH = 400     # 對應「縮放大小」上限
+
+
+def to_data_url(img, max_w: int, fmt: str = "WEBP", quality: int = 85) -> str:
+    """縮圖後編成 data URL（WEBP 保留透明，體積約 PNG 的 1/5）"""
+    if img.width > max_w:
+        ratio = max_w / img.width
+        img = img.resize((max_w, max(1, int(img.height * ratio))), Image.LANCZOS)
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, quality=quality)
+    mime = "image/webp" if fmt == "WEBP" else f"image/{fmt.lower()}"
+    return f"data:{mime};base64,{base64.b64encode(buf.getvalue()).decode('ascii')}"
+
+
+def design_placement(base_url: str, size, layers, rev: str, key=None):
+    """
+    - base_url：底圖 data URL（已含不可拖曳的圖層）
+    - size：底圖原始尺寸 (w, h)，圖層座標皆以此為準
+    - layers：[{key, src, cx, cy, aspect, sz, rot, ox, oy}, ...]
+    - rev：伺服器端狀態版本；改變時前端才重設圖層
+    回傳最後一次「確認套用」的結果（None 表示尚未套用）
+    """
+    return _design_placement(
+        base=base_url,
+        width=int(size[0]),
+        height=int(size[1]),
+        layers=layers,
+        rev=rev,
+        key=key,
+        default=None,
+    )
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# pricing.py － 價格計算 + 品牌方案分級
+# 主程式報價與後台訂單分析共用同一套規則，改價只改這裡
+
+# 尺寸固定排序（手機版不亂跳）
+SIZE_ORDER = ["S", "M", "L", "XL", "2XL", "3XL", "4XL", "5XL"]
+CP101_SIZE_ORDER = ["XS", "S", "M", "L", "XL", "2XL", "3XL", "4XL", "5XL"]
+
+
+def calculate_unit_price(qty: int, is_double_sided: bool) -> int:
+    """一般棉T（例如 AG21000）價格：按件數＆是否雙面計算單價"""
+    if qty < 20:
+        return 0
+    price_s, price_d = 410, 560
+    if 30 <= qty < 50:
+        price_s, price_d = 380, 530
+    elif 50 <= qty < 100:
+        price_s, price_d = 360, 510
+    elif 100 <= qty < 300:
+        price_s, price_d = 340, 490
+    elif qty >= 300:
+        price_s, price_d = 320, 470
+    return price_d if is_double_sided else price_s
+
+
+def calculate_cp101_price(size_counts: dict):
+    """
+    CP101 吸濕排汗團體服價格計算：
+    - 依總件數判斷級距（10–30, 30–100, 100 以上）
+    - 小尺碼（XS–2XL）與大尺碼（3XL–5XL）單價不同
+    - 回傳：(平均單價, 總價, small_price, big_price, small_qty, big_qty)
+    """
+    total_qty = int(sum(size_counts.values()))
+    if total_qty < 20:
+        return 0, 0, 0, 0, 0, 0  # 系統最低訂購量 20 件
+
+    small_sizes = ["XS", "S", "M", "L", "XL", "2XL"]
+    big_sizes = ["3XL", "4XL", "5XL"]
+
+    small_qty = int(sum(size_counts.get(s, 0) for s in small_sizes))
+    big_qty = int(sum(size_counts.get(s, 0) for s in big_sizes))
+
+    # 依總件數決定單價
+    if total_qty <= 30:
+        small_price, big_price = 255, 265
+    elif total_qty <= 100:
+        small_price, big_price = 245, 255
+    else:
+        small_price, big_price = 240, 250
+
+    total_price = small_qty * small_price + big_qty * big_price
+    avg_unit_price = round(total_price / total_qty) if total_qty > 0 else 0
+
+    return avg_unit_price, total_price, small_price, big_price, small_qty, big_qty
+
+
+def classify_plan(qty: int, is_double_sided: bool):
+    """
+    品牌分級：
+    - 20–49：團體款 Team Edition
+    - 50–99：企業款 Corporate Edition
+    - 100+ 或 雙面印刷：品牌款 Brand Edition
+    """
+    if qty < 20:
+        return None, None
+
+    if qty >= 100 or is_double_sided:
+        name = "品牌款 Brand Edition"
+        desc = "適合有明確品牌定位、需要一體化形象與高識別度的企業 / 品牌專案。"
+    elif qty >= 50:
+        name = "企業款 Corporate Edition"
+        desc = "適合公司制服、活動識別服，重視團隊感與一致的品牌觀感。"
+    else:
+        name = "團體款 Team Edition"
+        desc = "適合班服、社團、活動紀念服，以高 CP 值完成一次性專案。"
+    return name, desc
@@ -57,26 +57,31 @@ PRODUCT_CATALOG = {
             # 3. 檔名開頭 (圖片必須放在 assets 資料夾內)
             "image_base": "AG21000",
 
-            # 4. 正面印刷位置
+            # 底圖（整張寬度）對應的實際寬度 cm，以 M 號平放含袖量測；換算實際印刷尺寸用
+            # 各顏色底圖解析度不同（640 / 800 / 1024 px），比例一律以「底圖寬 ÷ 這個值」計算
+            "mockup_width_cm": {"front": 78.0, "back": 78.0},
+
+            # 4. 正面印刷位置（coords：中心點；area：可印刷範圍 (寬, 高)，單位同底圖像素）
             "pos_front": {
-                "正中間 (Center)": {"coords": (380, 270)},
-                "左胸 (Left Chest)": {"coords": (450, 230)},
-                "右胸 (Right Chest)": {"coords": (300, 230)},
-                "左臂 (Left Sleeve)": {"coords": (720, 150), "default_rot": 55},
-                "右臂 (Right Sleeve)": {"coords": (50, 180), "default_rot": -45},
+                "正中間 (Center)": {"coords": (380, 270), "area": (260, 300)},
+                "左胸 (Left Chest)": {"coords": (450, 230), "area": (110, 110)},
+                "右胸 (Right Chest)": {"coords": (300, 230), "area": (110, 110)},
+                "左臂 (Left Sleeve)": {"coords": (720, 150), "default_rot": 55, "area": (80, 80)},
+                "右臂 (Right Sleeve)": {"coords": (50, 180), "default_rot": -45, "area": (80, 80)},
             },
 
             # 5. 背面印刷位置
             "pos_back": {
-                "背後正中 (Center)": {"coords": (500, 320)},
-                "左臂-後 (L.Sleeve Back)": {"coords": (950, 240)},
-                "右臂-後 (R.Sleeve Back)": {"coords": (80, 270)},
+                "背後正中 (Center)": {"coords": (500, 320), "area": (360, 440)},
+                "左臂-後 (L.Sleeve Back)": {"coords": (950, 240), "area": (100, 100)},
+                "右臂-後 (R.Sleeve Back)": {"coords": (80, 270), "area": (100, 100)},
             },
         },
 
         "CP101 吸濕排汗團體服": {
             "name": "CP101 吸濕排汗團體服",
             "image_base": "CP101",
+            "mockup_width_cm": {"front": 76.0, "back": 76.0},
 
             "colors": [
                 "白色","淺灰色","深灰色","黑色","粉紅色",
@@ -136,14 +141,14 @@ PRODUCT_CATALOG = {
             },
 
             "pos_front": {
-                "正中間 (Center)": {"coords": (300, 360)},
-                "左胸 (Left Chest)": {"coords": (220, 340)},
-                "右胸 (Right Chest)": {"coords": (380, 340)},
+                "正中間 (Center)": {"coords": (300, 360), "area": (260, 320)},
+                "左胸 (Left Chest)": {"coords": (220, 340), "area": (100, 100)},
+                "右胸 (Right Chest)": {"coords": (380, 340), "area": (100, 100)},
             },
 
             "pos_back": {
-                "背中置中 (Center)": {"coords": (300, 360)},
-                "上背字樣 (Upper Back)": {"coords": (300, 280)},
+                "背中置中 (Center)": {"coords": (300, 360), "area": (360, 440)},
+                "上背字樣 (Upper Back)": {"coords": (300, 280), "area": (360, 120)},
             },
         },
     }
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+# quote_pdf.py － 詢價單 PDF 版（向量文字）
+# 1) 中文字以 NotoSansTC 向量文字輸出，PDF 內只嵌入有用到的字（subset），列印不糊
+# 2) 正反面示意圖各只嵌入一次，並先縮到列印需要的解析度再以 JPEG 壓縮
+# 3) 逐頁產生：總覽 → 各印刷位置明細 → 尺寸分佈
+
+import io
+import datetime
+
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+from PIL import Image
+
+PDF_FONT = "NotoSansTC"
+PDF_IMAGE_DPI = 200       # 嵌入圖片的目標解析度
+PDF_JPEG_QUALITY = 85
+
+PAGE_W = 210              # A4 (mm)
+MARGIN = 15
+
+COLOR_HEADER = (240, 230, 216)
+COLOR_TEXT = (60, 67, 74)
+COLOR_LABEL = (155, 163, 172)
+COLOR_ACCENT = (192, 57, 43)
+COLOR_FOOTER = (200, 68, 59)
+
+
+def _image_stream(img, width_mm: float, fmt: str = "JPEG"):
+    """依列印寬度縮圖並編碼；JPEG 會先鋪白底（示意圖不需要透明）"""
+    target_w = max(1, int(width_mm / 25.4 * PDF_IMAGE_DPI))
+    if img.width > target_w:
+        ratio = target_w / img.width
+        img = img.resize((target_w, max(1, int(img.height * ratio))), Image.LANCZOS)
+
+    buf = io.BytesIO()
+    if fmt == "JPEG":
+        bg = Image.new("RGB", img.size, "#FFFFFF")
+        if img.mode == "RGBA":
+            bg.paste(img, (0, 0), img)
+        else:
+            bg.paste(img.convert("RGB"), (0, 0))
+        bg.save(buf, format="JPEG", quality=PDF_JPEG_QUALITY, optimize=True)
+    else:
+        img.save(buf, format="PNG", optimize=True)
+    buf.seek(0)
+    return buf, img.height / img.width
+
+
+class _QuotePDF(FPDF):
+    def header(self):
+        self.set_fill_color(*COLOR_HEADER)
+        self.rect(0, 0, PAGE_W, 28, style="F")
+        self.set_xy(MARGIN, 8)
+        self.set_font(PDF_FONT, size=18)
+        self.set_text_color(74, 74, 74)
+        self.cell(0, 8, "HSINN ZHANG × MOMO")
+        self.set_xy(MARGIN, 18)
+        self.set_font(PDF_FONT, size=9)
+        self.set_text_color(138, 126, 106)
+        self.cell(0, 5, "ORIGINAL TEE ESTIMATE ｜ 客製服飾設計估價")
+        self.set_xy(PAGE_W - MARGIN - 50, 10)
+        self.cell(50, 5, f"DATE  {datetime.date.today().strftime('%Y-%m-%d')}", align="R")
+        self.set_y(36)
+
+    def footer(self):
+        self.set_y(-16)
+        self.set_fill_color(*COLOR_FOOTER)
+        self.rect(0, self.get_y(), PAGE_W, 16, style="F")
+        self.set_font(PDF_FONT, size=9)
+        self.set_text_color(255, 255, 255)
+        self.cell(
+            0, 16,
+            f"CONFIRMATION｜請將此檔案傳送至 LINE：@727jxovv 完成最終確認與下單　{self.page_no()}/{{nb}}",
+            align="C",
+        )
+
+    def section_title(self, text: str):
+        self.set_font(PDF_FONT, size=13)
+        self.set_text_color(*COLOR_TEXT)
+        self.cell(0, 9, text, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        self.ln(1)
+
+    def field(self, label: str, value: str):
+        self.set_font(PDF_FONT, size=8)
+        self.set_text_color(*COLOR_LABEL)
+        self.cell(0, 5, label, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        self.set_font(PDF_FONT, size=12)
+        self.set_text_color(*COLOR_TEXT)
+        self.multi_cell(0, 6, str(value), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        self.ln(2)
+
+
+def generate_inquiry_pdf(img_front, img_back, data, unit_price: int, size_counts: dict, design_layers, font_path: str):
+    """
+    PDF 版詢價單（與 PNG 詢價單同內容，另加印刷明細）
+    - design_layers：[("front"/"back", 位置名稱, 處理後圖片, 設計參數 dict, 印刷尺寸 (w_mm, h_mm) 或 None), ...]
+    - 回傳 PDF bytes
+    """
+    pdf = _QuotePDF(unit="mm", format="A4")
+    pdf.add_font(PDF_FONT, "", font_path)
+    pdf.set_margins(MARGIN, 36, MARGIN)
+    pdf.set_auto_page_break(True, margin=22)
+    pdf.alias_nb_pages()
+
+    qty = int(data.get("qty", 0))
+    content_w = PAGE_W - MARGIN * 2
+
+    # ========= 第 1 頁：總覽 =========
+    pdf.add_page()
+    pdf.section_title("DESIGN PREVIEW")
+    view_w = (content_w - 10) / 2
+    top = pdf.get_y()
+    max_h = 0
+    for i, (label, img) in enumerate([("FRONT VIEW", img_front), ("BACK VIEW", img_back)]):
+        x = MARGIN + i * (view_w + 10)
+        stream, aspect = _image_stream(img, view_w)
+        pdf.set_xy(x, top)
+        pdf.set_font(PDF_FONT, size=8)
+        pdf.set_text_color(147, 159, 168)
+        pdf.cell(view_w, 5, label, align="C")
+        pdf.image(stream, x=x, y=top + 6, w=view_w)
+        max_h = max(max_h, view_w * aspect)
+    pdf.set_y(top + 6 + max_h + 6)
+
+    pdf.set_fill_color(255, 243, 236)
+    box_y = pdf.get_y()
+    pdf.rect(MARGIN, box_y, content_w, 30, style="F")
+    pdf.set_xy(MARGIN + 5, box_y + 3)
+    pdf.set_font(PDF_FONT, size=11)
+    pdf.set_text_color(212, 104, 76)
+    pdf.cell(0, 6, "ESTIMATED TOTAL（預估總計）", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.set_x(MARGIN + 5)
+    pdf.set_font(PDF_FONT, size=20)
+    pdf.set_text_color(*COLOR_ACCENT)
+    pdf.cell(0, 10, f"NT$ {int(unit_price) * qty:,}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.set_x(MARGIN + 5)
+    pdf.set_font(PDF_FONT, size=10)
+    pdf.set_text_color(162, 126, 111)
+    pdf.cell(0, 6, f"＠ NT$ {int(unit_price)} × {qty} pcs")
+    pdf.set_y(box_y + 36)
+
+    if data.get("order_id"):
+        pdf.field("ORDER ID（訂單編號）", data["order_id"])
+    pdf.field("CLIENT NAME（客戶稱呼）", data.get("name", ""))
+    pdf.field("CONTACT INFO（聯絡方式）", f"{data.get('phone','')} / {data.get('line','')}")
+    pdf.field("PRODUCT SERIES（產品系列）", data.get("series", ""))
+    pdf.field("STYLE & COLOR（款式顏色）", data.get("variant", ""))
+    pdf.field("PRINTING METHOD（印刷工藝）", "DTF 數位膠膜印製")
+    if data.get("note"):
+        pdf.field("NOTE（需求備註）", data.get("note"))
+
+    # ========= 印刷位置明細（每個位置一頁）=========
+    for side, pos_name, layer, d_val, size_mm in design_layers:
+        pdf.add_page()
+        pdf.section_title(f"PRINT DETAIL｜{pos_name}")
+        thumb_w = 80
+        top = pdf.get_y()
+        # 直式文字 / 袖子圖很細長：高度不可超過本頁剩餘空間，圖置中於灰框
+        avail_h = pdf.h - pdf.b_margin - top
+        aspect = layer.height / max(1, layer.width)
+        box_h = min(thumb_w * aspect, avail_h)
+        draw_w = min(thumb_w, avail_h / aspect)
+        stream, aspect = _image_stream(layer, draw_w, fmt="PNG")
+        draw_h = draw_w * aspect
+        pdf.set_fill_color(240, 240, 240)
+        pdf.rect(MARGIN, top, thumb_w, box_h, style="F")
+        pdf.image(stream, x=MARGIN + (thumb_w - draw_w) / 2, y=top + (box_h - draw_h) / 2, w=draw_w)
+
+        pdf.set_left_margin(MARGIN + thumb_w + 10)
+        pdf.set_xy(MARGIN + thumb_w + 10, top)
+        pdf.field("SIDE（面）", "正面 Front" if side == "front" else "背面 Back")
+        if size_mm:
+            pdf.field("PRINT SIZE（印刷尺寸）", f"{size_mm[0] / 10:.1f} × {size_mm[1] / 10:.1f} cm")
+        else:
+            pdf.field("PRINT WIDTH（預覽寬度）", f"{int(d_val['sz'])} px")
+        pdf.field("ROTATION（旋轉）", f"{int(d_val['rot'])}°")
+        pdf.field("OFFSET（微調 X / Y）", f"{int(d_val['ox'])} / {int(d_val['oy'])}")
+        pdf.field("BACKGROUND REMOVAL（智能去背）", "是" if d_val.get("rb") else "否")
+        pdf.field("SOURCE PIXELS（圖案尺寸）", f"{layer.width} × {layer.height}")
+        if "trim_box" in layer.info:
+            l, t, r, b = layer.info["trim_box"]
+            pdf.field("TRIMMED（已裁透明邊）", f"({l}, {t}) – ({r}, {b})")
+        pdf.set_left_margin(MARGIN)
+
+    # ========= 尺寸分佈 =========
+    pdf.add_page()
+    pdf.section_title("SIZE BREAKDOWN（尺寸分佈）")
+    col_w = content_w / 2
+    pdf.set_font(PDF_FONT, size=10)
+    pdf.set_fill_color(240, 230, 216)
+    pdf.set_text_color(*COLOR_TEXT)
+    pdf.cell(col_w, 8, "SIZE", border=1, fill=True, align="C")
+    pdf.cell(col_w, 8, "QTY", border=1, fill=True, align="C", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    for size, n in size_counts.items():
+        if int(n) <= 0:
+            continue
+        pdf.cell(col_w, 8, size, border=1, align="C")
+        pdf.cell(col_w, 8, str(int(n)), border=1, align="C", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.cell(col_w, 8, "TOTAL", border=1, fill=True, align="C")
+    pdf.cell(col_w, 8, str(qty), border=1, fill=True, align="C", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    return bytes(pdf.output())
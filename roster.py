@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+# roster.py － 團體名單客製（名字 / 背號）
+# 1) 匯入 CSV 名單（name, number, size；中文欄名亦可），自動加總各尺寸件數
+# 2) 字型 glyph atlas：每個字只點陣化一次，之後排字只是貼遮罩，幾百個名字也很快
+# 3) 每人一張預覽與印刷檔，以多執行緒平行產生；另附總覽表（contact sheet）
+
+import io
+import os
+import csv
+import zipfile
+import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageDraw, ImageFont
+
+from imaging import trim_transparent
+
+COLUMN_ALIASES = {
+    "name": ("name", "姓名", "名字"),
+    "number": ("number", "no", "no.", "背號", "號碼"),
+    "size": ("size", "尺寸", "尺碼"),
+}
+
+SIZE_ALIASES = {"XXL": "2XL", "XXXL": "3XL", "XXXXL": "4XL", "XXXXXL": "5XL"}
+
+TEMPLATE_CSV = "name,number,size\n王小明,7,M\n陳大華,23,L\n"
+
+MAX_WORKERS = min(8, os.cpu_count() or 2)
+
+
+# ==========================================
+# 1. 名單匯入
+# ==========================================
+def _decode(file_bytes: bytes) -> str:
+    """Excel 另存的 CSV 常是 Big5（cp950），UTF-8 讀不了再試"""
+    for enc in ("utf-8-sig", "cp950"):
+        try:
+            return file_bytes.decode(enc)
+        except UnicodeDecodeError:
+            continue
+    return file_bytes.decode("utf-8", errors="replace")
+
+
+def normalize_size(size: str) -> str:
+    s = str(size or "").strip().upper().replace(" ", "")
+    return SIZE_ALIASES.get(s, s)
+
+
+def parse_roster(file_bytes: bytes, sizes):
+    """
+    讀取名單 CSV，回傳 (rows, errors)
+    - rows：[{name, number, size}, ...]（名字與背號都空白的列略過）
+    - errors：無法辨識尺寸等問題（第幾列 + 說明）
+    """
+    reader = csv.DictReader(io.StringIO(_decode(file_bytes)))
+    if not reader.fieldnames:
+        return [], ["名單是空的"]
+
+    columns = {}
+    for field in reader.fieldnames:
+        if field is None:
+            continue
+        key = field.strip().lower()
+        for col, aliases in COLUMN_ALIASES.items():
+            if key in aliases:
+                columns[col] = field
+    if "size" not in columns or not ({"name", "number"} & set(columns)):
+        return [], ["找不到欄位：需要 size，以及 name 或 number 其中之一"]
+
+    rows, errors = [], []
+    def cell(rec, col):
+        # 缺欄位時不可用 rec.get(None)：那是 DictReader 放多餘欄位（行尾逗號）的 list
+        if col not in columns:
+            return ""
+        return str(rec.get(columns[col]) or "").strip()
+
+    for line_no, rec in enumerate(reader, start=2):
+        name = cell(rec, "name")
+        number = cell(rec, "number")
+        if not name and not number:
+            continue
+        size = normalize_size(cell(rec, "size"))
+        if size not in sizes:
+            errors.append(f"第 {line_no} 列：尺寸「{cell(rec, 'size')}」不在此款式的尺寸中")
+            continue
+        rows.append({"name": name, "number": number, "size": size})
+    return rows, errors
+
+
+def count_sizes(rows, sizes) -> dict:
+    """名單 → 各尺寸件數（包含 0 件的尺寸，方便直接覆寫輸入框）"""
+    counts = {size: 0 for size in sizes}
+    for r in rows:
+        counts[r["size"]] += 1
+    return counts
+
+
+# ==========================================
+# 2. Glyph atlas
+# ==========================================
+class GlyphAtlas:
+    """
+    單一字型 / 字級的字形快取：{字: (遮罩, 左, 上, 字寬)}
+    FreeType face 不保證 thread-safe，點陣化集中在鎖內；排字只讀快取，可平行
+    """
+
+    def __init__(self, font_path: str, px: int):
+        self.px = px
+        self._font = ImageFont.truetype(font_path, px)
+        self._ascent, self._descent = self._font.getmetrics()
+        self._glyphs = {}
+        self._lock = threading.Lock()
+
+    def glyph(self, ch: str):
+        g = self._glyphs.get(ch)
+        if g is not None:
+            return g
+        with self._lock:
+            g = self._glyphs.get(ch)
+            if g is None:
+                left, top, right, bottom = self._font.getbbox(ch)
+                mask = None
+                if right > left and bottom > top:
+                    mask = Image.new("L", (right - left, bottom - top), 0)
+                    ImageDraw.Draw(mask).text((-left, -top), ch, font=self._font, fill=255)
+                g = (mask, left, top, self._font.getlength(ch))
+                self._glyphs[ch] = g
+        return g
+
+    def preload(self, texts):
+        """先把名單內所有字點陣化，平行排字時就不必搶鎖"""
+        for ch in set("".join(texts)):
+            self.glyph(ch)
+
+    def render(self, text: str, fill, tracking: float = 0.0):
+        """
+        排一行字，回傳裁掉透明邊的 RGBA
+        - tracking：字距（字級的比例）
+        """
+        glyphs = [self.glyph(ch) for ch in text]
+        gap = self.px * tracking
+        width = int(sum(g[3] for g in glyphs) + gap * max(0, len(glyphs) - 1)) + self.px
+        alpha = Image.new("L", (max(1, width), self._ascent + self._descent), 0)
+        x = 0.0
+        for mask, left, top, advance in glyphs:
+            if mask is not None:
+                alpha.paste(255, (int(x) + left, top), mask)
+            x += advance + gap
+        out = Image.new("RGBA", alpha.size, fill)
+        out.putalpha(alpha)
+        return trim_transparent(out)
+
+
+@lru_cache(maxsize=8)
+def get_atlas(font_path: str, px: int) -> GlyphAtlas:
+    return GlyphAtlas(font_path, px)
+
+
+# ==========================================
+# 3. 批次產生
+# ==========================================
+def render_all(rows, render_one, workers: int = MAX_WORKERS):
+    """render_one(index, row) 平行執行，結果依名單順序回傳"""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render_one, range(len(rows)), rows))
+
+
+def person_label(row: dict) -> str:
+    return " ".join(p for p in (row["number"], row["name"]) if p) or "-"
+
+
+def contact_sheet(items, font_path: str = None, cols: int = 6, thumb: int = 220):
+    """總覽表：items 為 [(標題, 預覽圖), ...]，縮圖排成格狀並標註"""
+    cols = max(1, min(cols, len(items)))
+    rows = (len(items) + cols - 1) // cols
+    caption_h = 36
+    pad = 12
+    sheet = Image.new("RGB", (cols * (thumb + pad) + pad, rows * (thumb + caption_h + pad) + pad), "white")
+    draw = ImageDraw.Draw(sheet)
+    try:
+        font = ImageFont.truetype(font_path, 18) if font_path else ImageFont.load_default()
+    except Exception:
+        font = ImageFont.load_default()
+
+    for i, (caption, img) in enumerate(items):
+        x = pad + (i % cols) * (thumb + pad)
+        y = pad + (i // cols) * (thumb + caption_h + pad)
+        t = img.convert("RGB")
+        t.thumbnail((thumb, thumb))
+        sheet.paste(t, (x + (thumb - t.width) // 2, y + (thumb - t.height) // 2))
+        draw.text((x + 4, y + thumb + 8), caption, fill="#333333", font=font)
+    return sheet
+
+
+def build_zip(files: dict) -> bytes:
+    """{檔名: bytes} → zip（圖檔本身已壓縮，只打包不再壓縮）"""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
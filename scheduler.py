@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# scheduler.py － 重運算排程（整個 process 共用）
+# 1) 每種運算各自限制同時執行數（去背 / 合成 / 詢價單）
+# 2) 同一種運算依 session 輪流放行，一位使用者連傳大圖不會卡住其他人
+# 3) 佇列有上限；等待中可回報目前排第幾位
+# 4) 等待回呼丟出例外（例如 Streamlit 重跑 / 離開頁面）時自動取消排隊
+
+import os
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+CPU_COUNT = os.cpu_count() or 2
+
+# segment 上限同時決定每個去背 session 的執行緒數（segmentation.INTRA_OP_THREADS = 核心數 ÷ 上限）
+DEFAULT_LIMITS = {
+    "segment": int(os.environ.get("MOMO_LIMIT_SEGMENT", max(1, CPU_COUNT // 2))),
+    "compose": int(os.environ.get("MOMO_LIMIT_COMPOSE", CPU_COUNT)),
+    "render": int(os.environ.get("MOMO_LIMIT_RENDER", max(1, CPU_COUNT // 2))),
+}
+
+MAX_QUEUE = 32            # 每種運算最多排隊數
+MAX_PER_SESSION = 4       # 每個 session 每種運算最多排隊數
+DONE_KEYS = 512           # 已完成（已快取）結果的記錄數
+
+
+class QueueFull(Exception):
+    """佇列已滿，請稍後再試"""
+
+
+class _Ticket:
+    __slots__ = ("session_id", "granted")
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.granted = False
+
+
+class Scheduler:
+    def __init__(self, limits=None, max_queue: int = MAX_QUEUE, max_per_session: int = MAX_PER_SESSION):
+        self._limits = dict(limits or DEFAULT_LIMITS)
+        self._max_queue = max_queue
+        self._max_per_session = max_per_session
+        self._cond = threading.Condition()
+        self._running = {op: 0 for op in self._limits}
+        self._queues = {op: {} for op in self._limits}        # op -> {session_id: deque[_Ticket]}
+        self._order = {op: deque() for op in self._limits}    # op -> 輪流順序（session_id）
+        self._done = {op: OrderedDict() for op in self._limits}
+
+    # ---- 已完成的 key：結果已在快取裡，再次呼叫不需要排隊 ----
+    def is_done(self, op: str, key) -> bool:
+        with self._cond:
+            return key in self._done[op]
+
+    def _mark_done(self, op: str, key):
+        done = self._done[op]
+        done[key] = True
+        done.move_to_end(key)
+        while len(done) > DONE_KEYS:
+            done.popitem(last=False)
+
+    # ---- 排隊與放行 ----
+    def _queued(self, op: str) -> int:
+        return sum(len(q) for q in self._queues[op].values())
+
+    def _dispatch(self, op: str):
+        """有空位就依 session 輪流放行"""
+        queues, order = self._queues[op], self._order[op]
+        while self._running[op] < self._limits[op] and order:
+            sid = order.popleft()
+            q = queues[sid]
+            ticket = q.popleft()
+            ticket.granted = True
+            self._running[op] += 1
+            if q:
+                order.append(sid)
+            else:
+                del queues[sid]
+        self._cond.notify_all()
+
+    def _position(self, op: str, ticket) -> int:
+        """依輪流規則推算前面還有幾位（1 = 下一個）"""
+        queues, order = self._queues[op], self._order[op]
+        own = queues[ticket.session_id]
+        k = own.index(ticket)
+        ahead = k
+        before_own = True
+        for sid in order:
+            if sid == ticket.session_id:
+                before_own = False
+                continue
+            ahead += min(len(queues[sid]), k + 1 if before_own else k)
+        return ahead + 1
+
+    def _remove(self, op: str, ticket):
+        q = self._queues[op].get(ticket.session_id)
+        if q and ticket in q:
+            q.remove(ticket)
+            if not q:
+                del self._queues[op][ticket.session_id]
+                self._order[op].remove(ticket.session_id)
+
+    @contextmanager
+    def slot(self, op: str, session_id, key=None, on_wait=None, poll: float = 0.5):
+        """
+        取得一個執行名額：
+            with scheduler.slot("segment", sid, key=..., on_wait=lambda pos: ...):
+                ...重運算...
+        - key 已完成過（結果在快取）時直接執行，不排隊
+        - on_wait(pos) 每 poll 秒回報排隊位置；回呼丟出例外即取消排隊
+        """
+        if key is not None and self.is_done(op, key):
+            yield
+            return
+
+        ticket = _Ticket(session_id)
+        with self._cond:
+            q = self._queues[op].get(session_id)
+            if self._queued(op) >= self._max_queue or (q and len(q) >= self._max_per_session):
+                raise QueueFull(op)
+            if q is None:
+                q = self._queues[op][session_id] = deque()
+                self._order[op].append(session_id)
+            q.append(ticket)
+            self._dispatch(op)
+
+        try:
+            while True:
+                with self._cond:
+                    if ticket.granted:
+                        break
+                    self._cond.wait(poll)
+                    if ticket.granted:
+                        break
+                    pos = self._position(op, ticket)
+                if on_wait is not None:
+                    on_wait(pos)
+            yield
+            if key is not None:
+                with self._cond:
+                    self._mark_done(op, key)
+        finally:
+            with self._cond:
+                if ticket.granted:
+                    self._running[op] -= 1
+                else:
+                    self._remove(op, ticket)
+                self._dispatch(op)
+
+    def stats(self):
+        """目前各運算的執行中 / 排隊數"""
+        with self._cond:
+            return {op: (self._running[op], self._queued(op)) for op in self._limits}
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# segmentation.py － 智能去背模型分級
+# 1) preview：即時預覽用小模型（預設 u2netp，約 4.7 MB，CPU 上快很多）
+# 2) final：詢價單 / 印刷輸出用高品質模型（預設 isnet-general-use）
+# 3) 可選 int8 量化版 ONNX（<rembg home>/quantized/<模型>.int8.onnx），CPU 主機再快一截
+#    rembg 只接受 rembg home（~/.rembg 或 U2NET_HOME）底下的自訂模型路徑，量化檔必須放這裡
+# 4) ONNX Runtime 執行緒數 = CPU 核心數 ÷ 同時去背數（scheduler 的 segment 上限），同時多張不會搶核心
+# 模型可用環境變數覆寫：MOMO_RB_PREVIEW_MODEL / MOMO_RB_FINAL_MODEL / MOMO_RB_QUANTIZED=1
+
+import os
+import threading
+from pathlib import Path
+
+import onnxruntime as ort
+from rembg import new_session, remove
+from rembg.sessions.base import BaseSession
+
+from scheduler import CPU_COUNT, DEFAULT_LIMITS
+
+TIERS = {
+    "preview": os.environ.get("MOMO_RB_PREVIEW_MODEL", "u2netp"),
+    "final": os.environ.get("MOMO_RB_FINAL_MODEL", "isnet-general-use"),
+}
+
+USE_QUANTIZED = os.environ.get("MOMO_RB_QUANTIZED", "") == "1"
+
+PROVIDERS = ["CPUExecutionProvider"]
+
+# 預設 SessionOptions 的 intra-op 執行緒會吃滿所有核心，多個去背 slot 同時跑就會互搶
+INTRA_OP_THREADS = max(1, CPU_COUNT // max(1, DEFAULT_LIMITS["segment"]))
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def _custom_session_name(model_name: str) -> str:
+    """自訂 ONNX 檔要沿用原模型的前後處理：isnet 系列用 dis_custom，其餘為 u2net 架構"""
+    return "dis_custom" if model_name.startswith("isnet") else "u2net_custom"
+
+
+def quantized_path(model_name: str) -> Path:
+    return Path(BaseSession.rembg_home()) / "quantized" / f"{model_name}.int8.onnx"
+
+
+def _session_options():
+    opts = ort.SessionOptions()
+    opts.intra_op_num_threads = INTRA_OP_THREADS
+    opts.inter_op_num_threads = 1
+    return opts
+
+
+def get_session(model_name: str, quantized: bool = None):
+    """取得（並快取）rembg session；量化檔不存在時自動退回原模型"""
+    if quantized is None:
+        quantized = USE_QUANTIZED
+    q_path = quantized_path(model_name)
+    use_q = bool(quantized and q_path.exists())
+    cache_key = (model_name, use_q)
+
+    with _sessions_lock:
+        if cache_key not in _sessions:
+            if use_q:
+                _sessions[cache_key] = new_session(
+                    _custom_session_name(model_name),
+                    sess_opts=_session_options(),
+                    providers=PROVIDERS,
+                    model_path=str(q_path),
+                )
+            else:
+                _sessions[cache_key] = new_session(model_name, sess_opts=_session_options(), providers=PROVIDERS)
+        return _sessions[cache_key]
+
+
+def infer_alpha(img, session):
+    """只回傳遮罩（L 模式，原圖尺寸）；bench_segmentation.py 比較 IoU 用"""
+    return remove(img, session=session, only_mask=True)
+
+
+def remove_background(img, tier: str = "preview"):
+    """
+    依分級去背；tier 為 TIERS 的 key
+    rembg 會自行把輸入縮到模型固定尺寸（u2netp 320²、isnet 1024²）推論，整張原圖直接交給它即可
+    """
+    return remove(img, session=get_session(TIERS[tier]))
+
+
+def quantize_model(model_name: str) -> Path:
+    """
+    產生 int8 動態量化版（離線執行一次即可，需要額外安裝 onnx）：
+        python -c "import segmentation as s; s.quantize_model('u2netp')"
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    # 原始模型的位置由 rembg 決定（<home>/models/<模型>/，舊版下載的 ~/.u2net 也認得），不自行猜路徑
+    session = new_session(model_name, providers=PROVIDERS)
+    src = type(session).download_models()
+    dst = quantized_path(model_name)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    quantize_dynamic(str(src), str(dst), weight_type=QuantType.QUInt8)
+    return dst
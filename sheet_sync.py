@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+# sheet_sync.py － Google Sheet 連線 + 增量同步 + 訂單統計
+# 1) 只抓上次同步之後新增的列（游標 = 已同步的列數），不再整張工作表拉回來
+# 2) 同步下來的列存進本地 SQLite（與 order_store 同一個資料庫）
+# 3) 統計表（商品 / 顏色 / 尺寸 / 方案 / 月份）隨新列累加，不用每次重算
+#    每次生成詢價單都會寫一列，統計的是「詢價」（含未成交估價），金額是各詢價單當時的報價
+# 4) 改了解析規則需要重算時用 resync_orders 清掉本地副本、從第一列重新同步
+
+import os
+import re
+import json
+import threading
+
+import streamlit as st
+import gspread
+from google.oauth2.service_account import Credentials
+
+from pricing import calculate_unit_price, calculate_cp101_price, classify_plan
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+]
+
+ORDERS_WORKSHEET = "orders"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sheet_orders (
+    order_id    TEXT PRIMARY KEY,
+    sheet_row   INTEGER NOT NULL,
+    order_date  TEXT,
+    series      TEXT,
+    style       TEXT,
+    color       TEXT,
+    qty         INTEGER,
+    unit_price  INTEGER,
+    revenue     INTEGER,
+    plan        TEXT,
+    size_counts TEXT
+);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    name   TEXT PRIMARY KEY,
+    cursor INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS order_agg (
+    dim     TEXT NOT NULL,
+    key     TEXT NOT NULL,
+    orders  INTEGER NOT NULL DEFAULT 0,
+    qty     INTEGER NOT NULL DEFAULT 0,
+    revenue INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dim, key)
+);
+"""
+
+_SYNC_LOCK = threading.Lock()
+
+
+# ==========================================
+# 連線 Google Sheet（支援 st.secrets 或環境變數）
+# ==========================================
+@st.cache_resource
+def connect_to_gsheet():
+    try:
+        if "gcp_service_account" in st.secrets:
+            info = st.secrets["gcp_service_account"]
+        elif "GCP_SERVICE_ACCOUNT" in os.environ:
+            info = json.loads(os.environ["GCP_SERVICE_ACCOUNT"])
+        else:
+            return None
+
+        creds = Credentials.from_service_account_info(info, scopes=SCOPES)
+        gc = gspread.authorize(creds)
+        return gc.open("momo_db")
+    except Exception:
+        return None
+
+
+# ==========================================
+# 解析 Sheet 列
+# ==========================================
+def parse_size_breakdown(text: str) -> dict:
+    """'S*3, M*5' → {'S': 3, 'M': 5}"""
+    counts = {}
+    for size, n in re.findall(r"([0-9]*X*[SML])\*(\d+)", str(text or "")):
+        counts[size] = counts.get(size, 0) + int(n)
+    return counts
+
+
+def parse_order_row(row, sides=None):
+    """
+    將 add_order_to_db 寫入的一列轉回結構化資料；不是訂單列（例如標題列）回傳 None
+    欄位：訂單編號, 稱呼, 聯絡人, 手機, LINE, 系列-款式 / 顏色, 件數, 尺寸 | $單價, 優惠碼, 日期
+    - sides：本地 order_store 中該訂單有設計的面（{"front", "back"}），用來判斷雙面；
+      查不到時（其他機器下的單）一般款由報價推回，CP101 價格不分單雙面、只能當單面
+    """
+    row = list(row) + [""] * (10 - len(row))
+    oid = str(row[0]).strip()
+    if not oid.startswith("ORD-"):
+        return None
+
+    series, _, variant = str(row[5]).partition("-")
+    style, _, color = variant.partition(" / ")
+    sizes_text, _, price_text = str(row[7]).partition("|")
+    size_counts = parse_size_breakdown(sizes_text)
+
+    try:
+        qty = int(row[6])
+    except (TypeError, ValueError):
+        qty = sum(size_counts.values())
+    recorded_price = int(re.sub(r"\D", "", price_text) or 0)
+
+    # 是否雙面：與主程式 classify_plan(total_qty, is_ds) 同一判斷（正反面都有設計）
+    is_cp101 = "CP101" in style
+    if sides is not None:
+        is_ds = {"front", "back"} <= set(sides)
+    else:
+        is_ds = not is_cp101 and recorded_price > 0 and recorded_price == calculate_unit_price(qty, True)
+
+    # 金額以詢價單當時的報價為準；舊列沒有記錄單價時才依目前規則補算
+    if recorded_price > 0:
+        unit_price, revenue = recorded_price, recorded_price * qty
+    elif is_cp101:
+        unit_price, revenue = calculate_cp101_price(size_counts)[:2]
+    else:
+        unit_price = calculate_unit_price(qty, is_ds)
+        revenue = unit_price * qty
+    plan = classify_plan(qty, is_ds)[0] or "未達最低量"
+
+    return {
+        "order_id": oid,
+        "order_date": str(row[9]).strip(),
+        "series": series.strip(),
+        "style": style.strip(),
+        "color": color.strip(),
+        "qty": qty,
+        "unit_price": int(unit_price),
+        "revenue": int(revenue),
+        "plan": plan,
+        "size_counts": size_counts,
+    }
+
+
+def _agg_rows(order: dict):
+    """一筆訂單對各統計維度的增量：(dim, key, orders, qty, revenue)"""
+    yield ("product", order["style"], 1, order["qty"], order["revenue"])
+    yield ("color", f"{order['style']} / {order['color']}", 1, order["qty"], order["revenue"])
+    yield ("plan", order["plan"], 1, order["qty"], order["revenue"])
+    yield ("month", order["order_date"][:7] or "未知", 1, order["qty"], order["revenue"])
+    for size, n in order["size_counts"].items():
+        yield ("size", size, 1, n, 0)
+
+
+# ==========================================
+# 增量同步
+# ==========================================
+def ensure_schema(conn):
+    """建立同步用資料表（與 order_store 共用同一個資料庫檔）"""
+    conn.executescript(SCHEMA)
+
+
+def sync_orders(sh, conn, worksheet: str = ORDERS_WORKSHEET) -> int:
+    """
+    從游標之後抓新列寫入本地，並累加統計；回傳新增筆數
+    - 同一筆訂單重複出現（例如手動複製列）只會計入一次
+    """
+    with _SYNC_LOCK:
+        return _sync_new_rows(sh, conn, worksheet)
+
+
+def resync_orders(sh, conn, worksheet: str = ORDERS_WORKSHEET) -> int:
+    """清掉本地同步副本與統計，從第一列重新同步；回傳同步筆數"""
+    with _SYNC_LOCK:
+        with conn:
+            conn.execute("DELETE FROM sheet_orders")
+            conn.execute("DELETE FROM order_agg")
+            conn.execute("DELETE FROM sync_state WHERE name = ?", (worksheet,))
+        return _sync_new_rows(sh, conn, worksheet)
+
+
+def _design_sides(conn, order_id: str):
+    """本地 order_store 中該訂單有設計的面；本機沒有這筆訂單時回傳 None"""
+    row = conn.execute("SELECT designs FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+    if row is None:
+        return None
+    return {d_key.split("_", 1)[0] for d_key in json.loads(row[0] or "{}")}
+
+
+def _sync_new_rows(sh, conn, worksheet: str) -> int:
+    row = conn.execute("SELECT cursor FROM sync_state WHERE name = ?", (worksheet,)).fetchone()
+    cursor = row[0] if row else 0
+
+    values = sh.worksheet(worksheet).get(f"A{cursor + 1}:J")
+    if not values:
+        return 0
+
+    added = 0
+    with conn:
+        for i, raw in enumerate(values, start=cursor + 1):
+            order = parse_order_row(raw, _design_sides(conn, str(raw[0]).strip()) if raw else None)
+            if order is None:
+                continue
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO sheet_orders (order_id, sheet_row, order_date, series, style, color,"
+                " qty, unit_price, revenue, plan, size_counts) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    order["order_id"], i, order["order_date"], order["series"], order["style"],
+                    order["color"], order["qty"], order["unit_price"], order["revenue"], order["plan"],
+                    json.dumps(order["size_counts"], ensure_ascii=False),
+                ),
+            )
+            if cur.rowcount != 1:
+                continue
+            conn.executemany(
+                "INSERT INTO order_agg (dim, key, orders, qty, revenue) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(dim, key) DO UPDATE SET orders = orders + excluded.orders,"
+                " qty = qty + excluded.qty, revenue = revenue + excluded.revenue",
+                list(_agg_rows(order)),
+            )
+            added += 1
+
+        conn.execute(
+            "INSERT INTO sync_state (name, cursor) VALUES (?, ?)"
+            " ON CONFLICT(name) DO UPDATE SET cursor = excluded.cursor",
+            (worksheet, cursor + len(values)),
+        )
+    return added
+
+
+def load_aggregates(conn, dim: str):
+    """讀取某一維度的統計：[(key, orders, qty, revenue), ...]，依件數多到少"""
+    return conn.execute(
+        "SELECT key, orders, qty, revenue FROM order_agg WHERE dim = ? ORDER BY qty DESC", (dim,)
+    ).fetchall()
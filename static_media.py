@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# static_media.py － 側欄照片 / 尺寸表等固定圖片的靜態檔服務
+# 1) 由 assets/ 原圖預先產生顯示用尺寸的壓縮版（WEBP），放在 static/（Streamlit 靜態檔目錄）
+# 2) 以 app/static/<檔名>?v=<內容雜湊> 引用：瀏覽器快取，重跑 / 重新整理都不再經 websocket 重送
+#    （Tornado 版伺服器對帶 v 參數的請求給長效 Cache-Control；新版則以 ETag 回 304）
+# 3) 原圖更新時檔名不變、雜湊改變，快取自動失效
+# 需在 .streamlit/config.toml 開啟 server.enableStaticServing
+# 部署時可先產生：python static_media.py
+
+import sys
+import hashlib
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+BASE_DIR = Path(__file__).resolve().parent
+ASSETS_DIR = BASE_DIR / "assets"
+STATIC_DIR = BASE_DIR / "static"      # Streamlit 固定從主程式旁的 static/ 提供檔案
+
+# 名稱 -> (候選原檔, 最大寬度 px)；寬度約為顯示寬度的 2 倍（高 DPI 螢幕）
+MEDIA = {
+    "owner": (("owner.jpg", "owner.png"), 600),
+    "size_chart": (("size_chart.png", "size_chart.jpg"), 1400),
+}
+
+WEBP_QUALITY = 82
+
+
+def source_path(name: str):
+    """找出原檔；都不存在時回傳 None"""
+    for fn in MEDIA[name][0]:
+        p = ASSETS_DIR / fn
+        if p.exists():
+            return p
+    return None
+
+
+def build_variant(name: str):
+    """
+    產生（或沿用）顯示版，回傳 (static 檔名, 內容雜湊)；找不到原檔時回傳 None
+    - 顯示版比原檔新就不重做
+    """
+    src = source_path(name)
+    if src is None:
+        return None
+    max_w = MEDIA[name][1]
+    out = STATIC_DIR / f"{name}_{max_w}.webp"
+    if not out.exists() or out.stat().st_mtime < src.stat().st_mtime:
+        with Image.open(src) as im:
+            img = ImageOps.exif_transpose(im)
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        if img.width > max_w:
+            img = img.resize((max_w, max(1, round(img.height * max_w / img.width))), Image.LANCZOS)
+        STATIC_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = out.with_name(out.name + ".tmp")
+        img.save(tmp, format="WEBP", quality=WEBP_QUALITY, method=6)
+        tmp.replace(out)
+    digest = hashlib.sha1(out.read_bytes()).hexdigest()[:12]
+    return out.name, digest
+
+
+def build_all():
+    """產生所有顯示版：{名稱: (static 檔名, 內容雜湊) 或 None}"""
+    return {name: build_variant(name) for name in MEDIA}
+
+
+def static_url(filename: str, digest: str) -> str:
+    """頁面內引用的相對網址（內容雜湊當版本參數）"""
+    return f"app/static/{filename}?v={digest}"
+
+
+def img_tag(url: str, caption: str = "", alt: str = "") -> str:
+    """等同 st.image 的排版：寬度填滿欄位、可加圖說"""
+    html = f'<img src="{url}" alt="{alt or caption}" loading="lazy" style="width:100%;height:auto;border-radius:4px;">'
+    if caption:
+        html += f'<div style="text-align:center;font-size:14px;color:#808495;margin-top:4px;">{caption}</div>'
+    return f"<div>{html}</div>"
+
+
+def main():
+    for name, built in build_all().items():
+        if built is None:
+            print(f"{name}：找不到原檔（{' / '.join(MEDIA[name][0])}）")
+            continue
+        filename, digest = built
+        src = source_path(name)
+        kb_src = src.stat().st_size / 1024
+        kb_out = (STATIC_DIR / filename).stat().st_size / 1024
+        print(f"{name}：{src.name} {kb_src:.0f} KB → static/{filename} {kb_out:.0f} KB（v={digest}）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())